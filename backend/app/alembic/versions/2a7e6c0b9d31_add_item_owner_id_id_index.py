@@ -0,0 +1,31 @@
+"""Add covering (owner_id, id) index on item
+
+Revision ID: 2a7e6c0b9d31
+Revises: 8e1c5a9d4f27
+Create Date: 2026-10-17 17:21:44.905312
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '2a7e6c0b9d31'
+down_revision = '8e1c5a9d4f27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Created on each partition too. The other columns are included so owner
+    # listings in id order are index only scans
+    op.create_index(
+        'ix_item_owner_id_id',
+        'item',
+        ['owner_id', 'id'],
+        unique=False,
+        postgresql_include=['title', 'description'],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_item_owner_id_id', table_name='item')
@@ -0,0 +1,76 @@
+"""Hash partition item by owner_id
+
+Revision ID: 5d9f3b7a2e10
+Revises: c4e8a1f2b6d7
+Create Date: 2026-10-17 14:48:52.630917
+
+"""
+from alembic import op
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision = '5d9f3b7a2e10'
+down_revision = 'c4e8a1f2b6d7'
+branch_labels = None
+depends_on = None
+
+
+def _copy_into_new_item_table(create_table: str) -> None:
+    # The old table and its constraints are renamed out of the way, the rows
+    # are copied into the new table and the old one is dropped
+    op.execute("ALTER TABLE item RENAME TO item_old")
+    op.execute("ALTER TABLE item_old RENAME CONSTRAINT item_pkey TO item_old_pkey")
+    op.execute(
+        "ALTER TABLE item_old RENAME CONSTRAINT item_owner_id_fkey "
+        "TO item_old_owner_id_fkey"
+    )
+    op.execute(create_table)
+    op.execute(
+        'ALTER TABLE item ADD CONSTRAINT item_owner_id_fkey FOREIGN KEY (owner_id) '
+        'REFERENCES "user" (id) ON DELETE CASCADE'
+    )
+
+
+def upgrade():
+    partitions = settings.ITEM_PARTITIONS
+    # The partition key must be part of the primary key, queries by owner_id
+    # only touch the partition of that owner
+    _copy_into_new_item_table(
+        """
+        CREATE TABLE item (
+            LIKE item_old INCLUDING DEFAULTS,
+            CONSTRAINT item_pkey PRIMARY KEY (id, owner_id)
+        ) PARTITION BY HASH (owner_id)
+        """
+    )
+    for remainder in range(partitions):
+        op.execute(
+            f"CREATE TABLE item_p{remainder} PARTITION OF item "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        )
+    op.execute(
+        "INSERT INTO item (id, owner_id, title, description) "
+        "SELECT id, owner_id, title, description FROM item_old"
+    )
+    op.execute("DROP TABLE item_old")
+    op.execute("ANALYZE item")
+
+
+def downgrade():
+    _copy_into_new_item_table(
+        """
+        CREATE TABLE item (
+            LIKE item_old INCLUDING DEFAULTS,
+            CONSTRAINT item_pkey PRIMARY KEY (id)
+        )
+        """
+    )
+    op.execute(
+        "INSERT INTO item (id, owner_id, title, description) "
+        "SELECT id, owner_id, title, description FROM item_old"
+    )
+    # Drops the partitions too
+    op.execute("DROP TABLE item_old")
+    op.execute("ANALYZE item")
@@ -0,0 +1,72 @@
+"""Add itemcount table maintained by triggers on item
+
+Revision ID: 6b4d8f1e3a92
+Revises: 2a7e6c0b9d31
+Create Date: 2026-10-17 18:02:13.447105
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b4d8f1e3a92'
+down_revision = '2a7e6c0b9d31'
+branch_labels = None
+depends_on = None
+
+
+# Statement level, so a bulk write updates each owner's counter once. Items
+# never change owner, updates don't need a trigger
+ITEM_COUNT_FUNCTION = """
+CREATE FUNCTION item_count_update() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO itemcount (owner_id, count)
+        SELECT owner_id, count(*) FROM new_items GROUP BY owner_id
+        ON CONFLICT (owner_id)
+        DO UPDATE SET count = itemcount.count + EXCLUDED.count;
+    ELSE
+        UPDATE itemcount SET count = itemcount.count - deleted.count
+        FROM (
+            SELECT owner_id, count(*) AS count FROM old_items GROUP BY owner_id
+        ) AS deleted
+        WHERE itemcount.owner_id = deleted.owner_id;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+
+def upgrade():
+    op.create_table('itemcount',
+    sa.Column('owner_id', sa.Uuid(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('owner_id')
+    )
+    # No item writes between the backfill and the triggers
+    op.execute("LOCK TABLE item IN SHARE ROW EXCLUSIVE MODE")
+    op.execute(ITEM_COUNT_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER item_count_insert AFTER INSERT ON item "
+        "REFERENCING NEW TABLE AS new_items "
+        "FOR EACH STATEMENT EXECUTE FUNCTION item_count_update()"
+    )
+    op.execute(
+        "CREATE TRIGGER item_count_delete AFTER DELETE ON item "
+        "REFERENCING OLD TABLE AS old_items "
+        "FOR EACH STATEMENT EXECUTE FUNCTION item_count_update()"
+    )
+    op.execute(
+        "INSERT INTO itemcount (owner_id, count) "
+        "SELECT owner_id, count(*) FROM item GROUP BY owner_id"
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER item_count_delete ON item")
+    op.execute("DROP TRIGGER item_count_insert ON item")
+    op.execute("DROP FUNCTION item_count_update()")
+    op.drop_table('itemcount')
@@ -0,0 +1,57 @@
+"""Default user and item ids to UUIDv7
+
+Revision ID: 7b2d4e19c0a5
+Revises: 3f6c2a8d91b4
+Create Date: 2026-10-17 11:02:17.402661
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2d4e19c0a5'
+down_revision = '3f6c2a8d91b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The application generates its own ids, the server default covers rows
+    # inserted by other means. Existing version 4 ids stay valid, both kinds
+    # are plain uuid values
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+            -- Millisecond timestamp over the first 48 bits of a random UUID,
+            -- then the version bits turned from 4 (0100) into 7 (0111)
+            SELECT encode(
+                set_bit(
+                    set_bit(
+                        overlay(
+                            uuid_send(gen_random_uuid())
+                            PLACING substring(
+                                int8send(
+                                    floor(
+                                        extract(epoch FROM clock_timestamp()) * 1000
+                                    )::bigint
+                                ) FROM 3
+                            )
+                            FROM 1 FOR 6
+                        ),
+                        52, 1
+                    ),
+                    53, 1
+                ),
+                'hex'
+            )::uuid
+        $$ LANGUAGE sql VOLATILE
+        """
+    )
+    op.execute('ALTER TABLE "user" ALTER COLUMN id SET DEFAULT uuid_generate_v7()')
+    op.execute("ALTER TABLE item ALTER COLUMN id SET DEFAULT uuid_generate_v7()")
+
+
+def downgrade():
+    op.execute("ALTER TABLE item ALTER COLUMN id DROP DEFAULT")
+    op.execute('ALTER TABLE "user" ALTER COLUMN id DROP DEFAULT')
+    op.execute("DROP FUNCTION uuid_generate_v7()")
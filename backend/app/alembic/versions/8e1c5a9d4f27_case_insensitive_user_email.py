@@ -0,0 +1,30 @@
+"""Case insensitive unique user email
+
+Revision ID: 8e1c5a9d4f27
+Revises: 5d9f3b7a2e10
+Create Date: 2026-10-17 16:05:39.271548
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e1c5a9d4f27'
+down_revision = '5d9f3b7a2e10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fails if existing emails only differ by case, those have to be merged
+    # first
+    op.create_index(
+        'ix_user_email_lower', 'user', [sa.text('lower(email)')], unique=True
+    )
+    op.drop_index('ix_user_email', table_name='user')
+
+
+def downgrade():
+    op.create_index('ix_user_email', 'user', ['email'], unique=True)
+    op.drop_index('ix_user_email_lower', table_name='user')
@@ -0,0 +1,34 @@
+"""Add user deleted_at
+
+Revision ID: c4e8a1f2b6d7
+Revises: 7b2d4e19c0a5
+Create Date: 2026-10-17 13:26:05.118734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1f2b6d7'
+down_revision = '7b2d4e19c0a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    # Only the few users waiting to be purged are indexed
+    op.create_index(
+        'ix_user_deleted_at',
+        'user',
+        ['deleted_at'],
+        unique=False,
+        postgresql_where=sa.text('deleted_at IS NOT NULL'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_user_deleted_at', table_name='user')
+    op.drop_column('user', 'deleted_at')
@@ -1,17 +1,26 @@
-from collections.abc import Generator
+import time
+import uuid
+from collections.abc import AsyncGenerator, Generator
 from typing import Annotated
 
-import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import make_transient_to_detached
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.api.middleware import prefers_primary
 from app.core import security
 from app.core.config import settings
-from app.core.db import engine
-from app.models import TokenPayload, User
+from app.core.db import async_engine, async_read_engine, engine, replicas
+from app.core.metrics import metrics
+from app.core.revocation import token_epochs
+from app.core.timeouts import apply_statement_timeout, cancel_on_disconnect
+from app.models import User
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
@@ -19,28 +28,117 @@ reusable_oauth2 = OAuth2PasswordBearer(
 
 
 def get_db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+    # Objects are returned right after commit, don't reload them with a SELECT
+    with Session(engine, expire_on_commit=False) as session:
         yield session
 
 
+def statement_timeout_budget(request: Request) -> int:
+    """
+    statement_timeout in milliseconds for the route, tightened by the
+    X-Request-Deadline header if the client sent one.
+    """
+    route = request.scope.get("route")
+    timeout = settings.DB_ROUTE_STATEMENT_TIMEOUTS_MS.get(
+        getattr(route, "name", ""), settings.DB_STATEMENT_TIMEOUT_MS
+    )
+    deadline = request.headers.get("X-Request-Deadline")
+    if deadline is None:
+        return timeout
+    try:
+        remaining = int((float(deadline) - time.time()) * 1000)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid X-Request-Deadline")
+    if remaining <= 0:
+        metrics.incr("db.deadline_exceeded")
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
+    return remaining if timeout == 0 else min(timeout, remaining)
+
+
+async def get_async_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    # Attributes can't be lazy loaded in async code, keep them after commit
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        apply_statement_timeout(
+            session, statement_timeout_budget(request), autocommit=False
+        )
+        yield session
+
+
+def _read_session(bind: AsyncEngine, request: Request) -> AsyncSession:
+    # Nothing is written, so there is nothing to flush before queries either
+    session = AsyncSession(bind, expire_on_commit=False, autoflush=False)
+    apply_statement_timeout(session, statement_timeout_budget(request), autocommit=True)
+    return session
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Autocommit session for read-only endpoints, on a healthy replica or on the
+    primary when there is none or the client wrote something recently. Queries
+    are cancelled if the client disconnects.
+    """
+    # Without replicas the token isn't decoded at all
+    if replicas.replicas and not prefers_primary(request):
+        replica = replicas.choose()
+        if replica is not None:
+            async with _read_session(replica.engine, request) as session:
+                try:
+                    # Connect now, to fall back to the primary if it is down
+                    await session.connection()
+                except DBAPIError:
+                    replicas.mark_failed(replica)
+                else:
+                    async with cancel_on_disconnect(request.receive, session):
+                        yield session
+                    return
+    async with _read_session(async_read_engine, request) as session:
+        async with cancel_on_disconnect(request.receive, session):
+            yield session
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+async def get_current_user(session: AsyncSessionDep, token: TokenDep) -> User:
+    cached = security.user_cache.get(token)
+    if cached is not None:
+        metrics.incr("auth.cache.hits")
+        token_data, snapshot = cached
+        # Rebuild the user as if it was loaded by this session, without a query
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        session.add(user)
+    else:
+        metrics.incr("auth.cache.misses")
+        try:
+            token_data = security.decode_token(token)
+            user_id = uuid.UUID(token_data.sub)
+        except (InvalidTokenError, ValidationError, TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            )
+        if not token_data.act:
+            raise HTTPException(status_code=400, detail="Inactive user")
+        db_user = await session.get(User, user_id)
+        if not db_user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user = db_user
+        expires_in = (token_data.exp or 0) - time.time()
+        ttl = min(settings.AUTH_CACHE_TTL_SECONDS, expires_in)
+        security.user_cache.set(
+            token, (token_data, user.model_dump()), ttl=ttl, tag=user.id
         )
-        token_data = TokenPayload(**payload)
-    except (InvalidTokenError, ValidationError):
+    if token_epochs.is_stale():
+        await token_epochs.refresh_async(session)
+    if token_data.epoch < token_epochs.get(user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return user
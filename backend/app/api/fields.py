@@ -0,0 +1,44 @@
+from typing import Any
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import load_only
+from sqlmodel import SQLModel
+
+
+def parse_fields(fields: str | None, model: type[SQLModel]) -> list[str] | None:
+    """
+    Fields of the public model requested with ?fields= (comma separated), id is
+    always included. None when the parameter is missing, i.e. every field.
+    """
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - model.model_fields.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    requested.add("id")
+    return [name for name in model.model_fields if name in requested]
+
+
+def load_fields(model: type[SQLModel], fields: list[str], *extra: str) -> Any:
+    """
+    Loader option selecting only the columns of the fields (and extra ones the
+    route needs), the others are deferred and must not be accessed.
+    """
+    return load_only(*(getattr(model, name) for name in [*fields, *extra]))
+
+
+def sparse(obj: Any, fields: list[str]) -> dict[str, Any]:
+    return {name: getattr(obj, name) for name in fields}
+
+
+def sparse_response(content: Any) -> JSONResponse:
+    """
+    Response with only the requested fields, returned as is since the response
+    model would require all of them.
+    """
+    return JSONResponse(jsonable_encoder(content))
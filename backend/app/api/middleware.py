@@ -0,0 +1,63 @@
+from jwt.exceptions import InvalidTokenError
+from pydantic import ValidationError
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import decode_token
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Users that made a successful write recently, kept in the memory of the
+# current worker process
+recent_writers: TTLCache[str, bool] = TTLCache(
+    maxsize=settings.READ_YOUR_WRITES_MAX_USERS
+)
+
+
+def _token_subject(headers: Headers) -> str | None:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_token(token).sub
+    except (InvalidTokenError, ValidationError):
+        return None
+
+
+def prefers_primary(request: Request) -> bool:
+    """
+    Whether the authenticated user wrote something recently and must read from
+    the primary to see it.
+    """
+    subject = _token_subject(request.headers)
+    return subject is not None and recent_writers.get(subject) is not None
+
+
+class ReadYourWritesMiddleware:
+    """
+    Remembers the users that made a successful write for a short while, so
+    their next reads skip the replicas until those caught up.
+    """
+
+    def __init__(self, app: ASGIApp, window: int) -> None:
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        subject = _token_subject(Headers(scope=scope))
+        if subject is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                recent_writers.set(subject, True, ttl=self.window)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
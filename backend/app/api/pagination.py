@@ -0,0 +1,98 @@
+import base64
+import binascii
+import json
+import uuid
+from collections.abc import Sequence
+from typing import Any, Literal, TypeVar
+
+from fastapi import HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import crud
+from app.core.dialect import IS_POSTGRES
+
+T = TypeVar("T")
+
+# How the total count of a listing is computed, "none" skips it
+CountMode = Literal["exact", "estimate", "none"]
+
+
+def encode_cursor(last_id: uuid.UUID) -> str:
+    payload = json.dumps({"id": str(last_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> uuid.UUID:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        return uuid.UUID(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    statement: Any, key: Any, *, cursor: str | None, skip: int, limit: int
+) -> Any:
+    """
+    Order the statement by key (unique) and seek past the cursor, or skip rows
+    when there is no cursor. One more row than the page is fetched to know if
+    there is a next page.
+    """
+    statement = statement.order_by(key)
+    if cursor is not None:
+        statement = statement.where(key > decode_cursor(cursor))
+    else:
+        statement = statement.offset(skip)
+    return statement.limit(limit + 1)
+
+
+def page(rows: Sequence[T], limit: int) -> tuple[Sequence[T], str | None]:
+    """
+    Split the rows fetched by paginate() into the page and the next cursor.
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].id)  # type: ignore[attr-defined]
+
+
+async def fetch_page(
+    session: AsyncSession,
+    statement: Any,
+    key: Any,
+    *,
+    count_statement: Any,
+    count: CountMode,
+    estimate_table: str | None = None,
+    cursor: str | None,
+    skip: int,
+    limit: int,
+) -> tuple[Sequence[Any], int | None, str | None]:
+    """
+    Fetch a page of the statement (see paginate()) with its total count,
+    returns the rows, the count and the next cursor.
+
+    The exact count is a scalar subquery of the page query, so both come from
+    the same snapshot in one round trip. It is queried on its own only when the
+    page is empty. The estimate reads the planner statistics of estimate_table
+    instead, when given and on Postgres.
+    """
+    statement = paginate(statement, key, cursor=cursor, skip=skip, limit=limit)
+    total: int | None = None
+    if count == "estimate" and estimate_table is not None and IS_POSTGRES:
+        total = await crud.estimate_rows_async(session=session, table=estimate_table)
+    elif count != "none":
+        # Not correlated, it is evaluated once for the whole query
+        subquery = count_statement.correlate(None).scalar_subquery()
+        # execute() and not exec(), which would only keep the first column
+        result = await session.execute(statement.add_columns(subquery))
+        results = result.all()
+        if not results:
+            total = (await session.exec(count_statement)).one()
+            return [], total, None
+        data, next_cursor = page([row for row, _ in results], limit)
+        return data, results[0][1], next_cursor
+    rows = (await session.exec(statement)).all()
+    data, next_cursor = page(rows, limit)
+    return data, total, next_cursor
@@ -1,109 +1,280 @@
 import uuid
-from typing import Any
+from typing import Annotated, Any
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+from fastapi import APIRouter, Body, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.api.deps import CurrentUser, SessionDep
-from app.models import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate, Message
+from app import crud
+from app.api.deps import AsyncSessionDep, CurrentUser, ReadSessionDep, SessionDep
+from app.api.fields import load_fields, parse_fields, sparse, sparse_response
+from app.api.pagination import CountMode, fetch_page
+from app.bulk import BulkFormat, TooManyRows, create_items_bulk
+from app.core.config import settings
+from app.export import EXPORT_MEDIA_TYPES, export_items
+from app.models import (
+    Item,
+    ItemBulkWriteResult,
+    ItemCreate,
+    ItemPublic,
+    ItemsBulkPublic,
+    ItemsBulkUpdate,
+    ItemsBulkWritePublic,
+    ItemsFilter,
+    ItemsPublic,
+    ItemUpdate,
+    Message,
+)
 
 router = APIRouter(prefix="/items", tags=["items"])
 
 
+async def item_error(session: AsyncSession, id: uuid.UUID) -> HTTPException:
+    """
+    Error for an item a write didn't match, only queried on that error path.
+    """
+    exists = (await session.exec(select(Item.id).where(Item.id == id))).first()
+    if exists is None:
+        return HTTPException(status_code=404, detail="Item not found")
+    return HTTPException(status_code=400, detail="Not enough permissions")
+
+
 @router.get("/", response_model=ItemsPublic)
-def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+async def read_items(
+    session: ReadSessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count: CountMode = "exact",
+    fields: str | None = None,
 ) -> Any:
     """
-    Retrieve items.
+    Retrieve items, in id order. Follow next_cursor for the next pages, skip
+    is only used without a cursor. Pass fields (e.g. id,title) to only get
+    those.
     """
 
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(Item)
-        count = session.exec(count_statement).one()
-        statement = select(Item).offset(skip).limit(limit)
-        items = session.exec(statement).all()
-    else:
-        count_statement = (
-            select(func.count())
-            .select_from(Item)
-            .where(Item.owner_id == current_user.id)
-        )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(Item)
-            .where(Item.owner_id == current_user.id)
-            .offset(skip)
-            .limit(limit)
+    requested = parse_fields(fields, ItemPublic)
+    owner_id = None if current_user.is_superuser else current_user.id
+    statement = select(Item)
+    if owner_id is not None:
+        statement = statement.where(Item.owner_id == owner_id)
+    if requested is not None:
+        statement = statement.options(load_fields(Item, requested))
+    # Owners' counts are a single counter row already, only the total across
+    # all owners is estimated
+    data, total, next_cursor = await fetch_page(
+        session,
+        statement,
+        Item.id,
+        count_statement=crud.item_count_statement(owner_id),
+        count=count,
+        estimate_table="item" if owner_id is None else None,
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+    )
+    if requested is not None:
+        return sparse_response(
+            {
+                "data": [sparse(item, requested) for item in data],
+                "count": total,
+                "next_cursor": next_cursor,
+            }
         )
-        items = session.exec(statement).all()
+    return ItemsPublic(data=data, count=total, next_cursor=next_cursor)
 
-    return ItemsPublic(data=items, count=count)
+
+@router.get("/export")
+async def export(
+    current_user: CurrentUser, format: BulkFormat = "ndjson"
+) -> StreamingResponse:
+    """
+    Export the items (of every user for superusers) as NDJSON or CSV, streamed
+    in id order.
+    """
+    content = export_items(
+        owner_id=None if current_user.is_superuser else current_user.id,
+        format=format,
+        batch_size=settings.ITEMS_EXPORT_BATCH_SIZE,
+    )
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="items.{format}"'},
+    )
 
 
 @router.get("/{id}", response_model=ItemPublic)
-def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) -> Any:
+async def read_item(
+    session: ReadSessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,
+    fields: str | None = None,
+) -> Any:
     """
-    Get item by ID.
+    Get item by ID. Pass fields (e.g. id,title) to only get those.
     """
-    item = session.get(Item, id)
+    requested = parse_fields(fields, ItemPublic)
+    # owner_id is needed for the permission check
+    options = [] if requested is None else [load_fields(Item, requested, "owner_id")]
+    item = await session.get(Item, id, options=options)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     if not current_user.is_superuser and (item.owner_id != current_user.id):
         raise HTTPException(status_code=400, detail="Not enough permissions")
+    if requested is not None:
+        return sparse_response(sparse(item, requested))
     return item
 
 
 @router.post("/", response_model=ItemPublic)
-def create_item(
-    *, session: SessionDep, current_user: CurrentUser, item_in: ItemCreate
+async def create_item(
+    *, session: AsyncSessionDep, current_user: CurrentUser, item_in: ItemCreate
 ) -> Any:
     """
     Create new item.
     """
     item = Item.model_validate(item_in, update={"owner_id": current_user.id})
     session.add(item)
-    session.commit()
-    session.refresh(item)
+    await session.commit()
     return item
 
 
-@router.put("/{id}", response_model=ItemPublic)
-def update_item(
+@router.post("/bulk", response_model=ItemsBulkPublic)
+def create_items(
     *,
     session: SessionDep,
     current_user: CurrentUser,
+    content: Annotated[str, Body(media_type="application/x-ndjson")],
+    format: BulkFormat = "ndjson",
+) -> Any:
+    """
+    Create items in bulk from NDJSON or CSV (with a header row) ItemCreate rows.
+    """
+    # Kept sync like the users one, it runs in the threadpool
+    try:
+        return create_items_bulk(
+            session=session,
+            content=content,
+            format=format,
+            owner_id=current_user.id,
+            batch_size=settings.ITEMS_BULK_BATCH_SIZE,
+            max_rows=settings.ITEMS_BULK_MAX_ROWS,
+        )
+    except TooManyRows as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+def check_items_filter(items_filter: ItemsFilter) -> None:
+    if items_filter.ids is None and items_filter.title_prefix is None:
+        raise HTTPException(
+            status_code=400, detail="Select the items with ids or title_prefix"
+        )
+    max_rows = settings.ITEMS_BULK_WRITE_MAX_ROWS
+    if items_filter.ids is not None and len(items_filter.ids) > max_rows:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {max_rows} items can be written per request",
+        )
+
+
+def bulk_write_public(
+    items_filter: ItemsFilter, written: list[uuid.UUID], has_more: bool, status: str
+) -> ItemsBulkWritePublic:
+    """
+    Result of every requested id (not_found when it's not an item the user can
+    write), or of every item written when selected by title prefix.
+    """
+    if items_filter.ids is None:
+        data = [ItemBulkWriteResult(id=item_id, status=status) for item_id in written]
+    else:
+        done = set(written)
+        data = [
+            ItemBulkWriteResult(
+                id=item_id, status=status if item_id in done else "not_found"
+            )
+            for item_id in items_filter.ids
+        ]
+    return ItemsBulkWritePublic(data=data, count=len(written), has_more=has_more)
+
+
+@router.patch("/bulk", response_model=ItemsBulkWritePublic)
+async def update_items(
+    *, session: AsyncSessionDep, current_user: CurrentUser, body: ItemsBulkUpdate
+) -> Any:
+    """
+    Update the items selected by ids and/or title prefix with the same values.
+    """
+    check_items_filter(body)
+    values = body.values.model_dump(exclude_unset=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="No values to update")
+    written, has_more = await crud.update_items_async(
+        session=session,
+        owner_id=None if current_user.is_superuser else current_user.id,
+        items_filter=body,
+        values=values,
+        batch_size=settings.ITEMS_BULK_WRITE_BATCH_SIZE,
+        max_rows=settings.ITEMS_BULK_WRITE_MAX_ROWS,
+    )
+    return bulk_write_public(body, written, has_more, "updated")
+
+
+@router.delete("/bulk", response_model=ItemsBulkWritePublic)
+async def delete_items(
+    *, session: AsyncSessionDep, current_user: CurrentUser, body: ItemsFilter
+) -> Any:
+    """
+    Delete the items selected by ids and/or title prefix.
+    """
+    check_items_filter(body)
+    written, has_more = await crud.delete_items_async(
+        session=session,
+        owner_id=None if current_user.is_superuser else current_user.id,
+        items_filter=body,
+        batch_size=settings.ITEMS_BULK_WRITE_BATCH_SIZE,
+        max_rows=settings.ITEMS_BULK_WRITE_MAX_ROWS,
+    )
+    return bulk_write_public(body, written, has_more, "deleted")
+
+
+@router.put("/{id}", response_model=ItemPublic)
+async def update_item(
+    *,
+    session: AsyncSessionDep,
+    current_user: CurrentUser,
     id: uuid.UUID,
     item_in: ItemUpdate,
 ) -> Any:
     """
     Update an item.
     """
-    item = session.get(Item, id)
+    item = await crud.update_item_async(
+        session=session,
+        item_id=id,
+        owner_id=None if current_user.is_superuser else current_user.id,
+        item_in=item_in,
+    )
     if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    if not current_user.is_superuser and (item.owner_id != current_user.id):
-        raise HTTPException(status_code=400, detail="Not enough permissions")
-    update_dict = item_in.model_dump(exclude_unset=True)
-    item.sqlmodel_update(update_dict)
-    session.add(item)
-    session.commit()
-    session.refresh(item)
+        raise await item_error(session, id)
     return item
 
 
 @router.delete("/{id}")
-def delete_item(
-    session: SessionDep, current_user: CurrentUser, id: uuid.UUID
+async def delete_item(
+    session: AsyncSessionDep, current_user: CurrentUser, id: uuid.UUID
 ) -> Message:
     """
     Delete an item.
     """
-    item = session.get(Item, id)
-    if not item:
-        raise HTTPException(status_code=404, detail="Item not found")
-    if not current_user.is_superuser and (item.owner_id != current_user.id):
-        raise HTTPException(status_code=400, detail="Not enough permissions")
-    session.delete(item)
-    session.commit()
+    deleted = await crud.delete_item_async(
+        session=session,
+        item_id=id,
+        owner_id=None if current_user.is_superuser else current_user.id,
+    )
+    if not deleted:
+        raise await item_error(session, id)
     return Message(message="Item deleted successfully")
@@ -1,16 +1,35 @@
+import math
+import uuid
 from datetime import timedelta
 from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from jwt.exceptions import InvalidTokenError
+from pydantic import ValidationError
+from sqlmodel import Session
 
 from app import crud
-from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.api.deps import (
+    AsyncSessionDep,
+    CurrentUser,
+    SessionDep,
+    get_current_active_superuser,
+)
 from app.core import security
 from app.core.config import settings
-from app.core.security import get_password_hash
-from app.models import Message, NewPassword, Token, UserPublic
+from app.core.db import engine
+from app.core.rate_limit import RateLimitExceeded, rate_limiter
+from app.core.security import get_password_hash_async
+from app.models import (
+    Message,
+    NewPassword,
+    RefreshTokenRequest,
+    Token,
+    User,
+    UserPublic,
+)
 from app.utils import (
     generate_password_reset_token,
     generate_reset_password_email,
@@ -21,26 +40,128 @@ from app.utils import (
 router = APIRouter(tags=["login"])
 
 
-@router.post("/login/access-token")
-def login_access_token(
-    session: SessionDep, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def _check_rate_limits(*checks: tuple[str, int]) -> None:
+    try:
+        for key, limit in checks:
+            rate_limiter.check(
+                key, limit=limit, window=settings.RATE_LIMIT_WINDOW_SECONDS
+            )
+    except RateLimitExceeded as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, try again later",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+
+
+def login_rate_limit(
+    request: Request, form_data: Annotated[OAuth2PasswordRequestForm, Depends()]
+) -> None:
+    _check_rate_limits(
+        (f"login:ip:{_client_ip(request)}", settings.LOGIN_RATE_LIMIT_PER_IP),
+        (
+            f"login:user:{form_data.username.lower()}",
+            settings.LOGIN_RATE_LIMIT_PER_USERNAME,
+        ),
+    )
+
+
+def password_recovery_rate_limit(request: Request, email: str) -> None:
+    _check_rate_limits(
+        (
+            f"password-recovery:ip:{_client_ip(request)}",
+            settings.PASSWORD_RECOVERY_RATE_LIMIT_PER_IP,
+        ),
+        (
+            f"password-recovery:email:{email.lower()}",
+            settings.PASSWORD_RECOVERY_RATE_LIMIT_PER_EMAIL,
+        ),
+    )
+
+
+def issue_tokens(user: User, epoch: int) -> Token:
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    refresh_token_expires = timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
+    return Token(
+        access_token=security.create_access_token(
+            user.id,
+            expires_delta=access_token_expires,
+            epoch=epoch,
+            is_active=user.is_active,
+            is_superuser=user.is_superuser,
+        ),
+        refresh_token=security.create_refresh_token(
+            user.id, expires_delta=refresh_token_expires, epoch=epoch
+        ),
+    )
+
+
+def store_rehashed_password(user_id: uuid.UUID, hashed_password: str) -> None:
+    with Session(engine) as session:
+        crud.update_password_hash(
+            session=session, user_id=user_id, hashed_password=hashed_password
+        )
+
+
+@router.post("/login/access-token", dependencies=[Depends(login_rate_limit)])
+async def login_access_token(
+    session: AsyncSessionDep,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    background_tasks: BackgroundTasks,
 ) -> Token:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = crud.authenticate(
-        session=session, email=form_data.username, password=form_data.password
+
+    def on_rehash(user_id: uuid.UUID, hashed_password: str) -> None:
+        background_tasks.add_task(store_rehashed_password, user_id, hashed_password)
+
+    user = await crud.authenticate_async(
+        session=session,
+        email=form_data.username,
+        password=form_data.password,
+        on_rehash=on_rehash,
     )
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    return Token(
-        access_token=security.create_access_token(
-            user.id, expires_delta=access_token_expires
-        )
-    )
+    epoch = await crud.get_token_epoch_async(session=session, user_id=user.id)
+    return issue_tokens(user, epoch)
+
+
+@router.post("/login/refresh-token")
+def refresh_access_token(session: SessionDep, body: RefreshTokenRequest) -> Token:
+    """
+    Get a new access token (and refresh token) using a refresh token
+    """
+    try:
+        token_data = security.decode_token(body.refresh_token, token_type="refresh")
+        user_id = uuid.UUID(token_data.sub)
+    except (InvalidTokenError, ValidationError, TypeError, ValueError):
+        raise HTTPException(status_code=403, detail="Could not validate credentials")
+    user = session.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    elif not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    epoch = crud.get_token_epoch(session=session, user_id=user.id)
+    if token_data.epoch < epoch:
+        raise HTTPException(status_code=403, detail="Could not validate credentials")
+    return issue_tokens(user, epoch)
+
+
+@router.post("/logout")
+def logout(session: SessionDep, current_user: CurrentUser) -> Message:
+    """
+    Revoke all the access and refresh tokens of the current user
+    """
+    crud.revoke_user_tokens(session=session, user_id=current_user.id)
+    return Message(message="Logged out successfully")
 
 
 @router.post("/login/test-token", response_model=UserPublic)
@@ -51,7 +172,9 @@ def test_token(current_user: CurrentUser) -> Any:
     return current_user
 
 
-@router.post("/password-recovery/{email}")
+@router.post(
+    "/password-recovery/{email}", dependencies=[Depends(password_recovery_rate_limit)]
+)
 def recover_password(email: str, session: SessionDep) -> Message:
     """
     Password Recovery
@@ -76,14 +199,14 @@ def recover_password(email: str, session: SessionDep) -> Message:
 
 
 @router.post("/reset-password/")
-def reset_password(session: SessionDep, body: NewPassword) -> Message:
+async def reset_password(session: AsyncSessionDep, body: NewPassword) -> Message:
     """
     Reset password
     """
     email = verify_password_reset_token(token=body.token)
     if not email:
         raise HTTPException(status_code=400, detail="Invalid token")
-    user = crud.get_user_by_email(session=session, email=email)
+    user = await crud.get_user_by_email_async(session=session, email=email)
     if not user:
         raise HTTPException(
             status_code=404,
@@ -91,10 +214,11 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
         )
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    hashed_password = get_password_hash(password=body.new_password)
+    hashed_password = await get_password_hash_async(body.new_password)
     user.hashed_password = hashed_password
     session.add(user)
-    session.commit()
+    await session.commit()
+    await crud.revoke_user_tokens_async(session=session, user_id=user.id)
     return Message(message="Password updated successfully")
 
 
@@ -1,25 +1,38 @@
 import uuid
-from typing import Any
+from datetime import datetime, timezone
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import col, delete, func, select
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session, col, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import crud
 from app.api.deps import (
+    AsyncSessionDep,
     CurrentUser,
+    ReadSessionDep,
     SessionDep,
     get_current_active_superuser,
 )
+from app.api.fields import load_fields, parse_fields, sparse, sparse_response
+from app.api.pagination import CountMode, fetch_page
+from app.bulk import BulkFormat, TooManyRows, create_users_bulk
 from app.core.config import settings
-from app.core.security import get_password_hash, verify_password
+from app.core.db import engine
+from app.core.security import (
+    get_password_hash_async,
+    invalidate_user_cache,
+    verify_password_async,
+)
 from app.models import (
-    Item,
     Message,
     UpdatePassword,
     User,
     UserCreate,
     UserPublic,
     UserRegister,
+    UsersBulkPublic,
     UsersPublic,
     UserUpdate,
     UserUpdateMe,
@@ -34,40 +47,76 @@ router = APIRouter(prefix="/users", tags=["users"])
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+async def read_users(
+    session: ReadSessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count: CountMode = "exact",
+    fields: str | None = None,
+) -> Any:
     """
-    Retrieve users.
+    Retrieve users, in id order. Follow next_cursor for the next pages, skip
+    is only used without a cursor. Pass fields (e.g. id,email) to only get
+    those.
     """
 
-    count_statement = select(func.count()).select_from(User)
-    count = session.exec(count_statement).one()
-
-    statement = select(User).offset(skip).limit(limit)
-    users = session.exec(statement).all()
-
-    return UsersPublic(data=users, count=count)
+    requested = parse_fields(fields, UserPublic)
+    # Users being purged are already gone as far as the API is concerned
+    not_deleted = col(User.deleted_at).is_(None)
+    count_statement = select(func.count()).select_from(User).where(not_deleted)
+    statement = select(User).where(not_deleted)
+    if requested is not None:
+        statement = statement.options(load_fields(User, requested))
+    data, total, next_cursor = await fetch_page(
+        session,
+        statement,
+        User.id,
+        count_statement=count_statement,
+        count=count,
+        estimate_table="user",
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+    )
+    if requested is not None:
+        return sparse_response(
+            {
+                "data": [sparse(user, requested) for user in data],
+                "count": total,
+                "next_cursor": next_cursor,
+            }
+        )
+    return UsersPublic(data=data, count=total, next_cursor=next_cursor)
 
 
 @router.post(
     "/", dependencies=[Depends(get_current_active_superuser)], response_model=UserPublic
 )
-def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
+async def create_user(
+    *,
+    session: AsyncSessionDep,
+    user_in: UserCreate,
+    background_tasks: BackgroundTasks,
+) -> Any:
     """
     Create new user.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
-    if user:
+    user = await crud.create_user_async(session=session, user_create=user_in)
+    if not user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system.",
         )
-
-    user = crud.create_user(session=session, user_create=user_in)
     if settings.emails_enabled and user_in.email:
-        email_data = generate_new_account_email(
-            email_to=user_in.email, username=user_in.email, password=user_in.password
+        email_data = await run_in_threadpool(
+            generate_new_account_email,
+            email_to=user_in.email,
+            username=user_in.email,
+            password=user_in.password,
         )
-        send_email(
+        background_tasks.add_task(
+            send_email,
             email_to=user_in.email,
             subject=email_data.subject,
             html_content=email_data.html_content,
@@ -75,16 +124,81 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
     return user
 
 
+@router.post(
+    "/bulk",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=UsersBulkPublic,
+)
+def create_users(
+    *,
+    session: SessionDep,
+    content: Annotated[str, Body(media_type="application/x-ndjson")],
+    format: BulkFormat = "ndjson",
+) -> Any:
+    """
+    Create users in bulk from NDJSON or CSV (with a header row) UserCreate rows.
+    """
+    # Kept sync on purpose: it's a long batch job, it runs in the threadpool
+    # instead of blocking the event loop
+    try:
+        return create_users_bulk(
+            session=session,
+            content=content,
+            format=format,
+            batch_size=settings.USERS_BULK_BATCH_SIZE,
+            max_rows=settings.USERS_BULK_MAX_ROWS,
+        )
+    except TooManyRows as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+def purge_deleted_user(user_id: uuid.UUID) -> None:
+    with Session(engine) as session:
+        crud.purge_user(
+            session=session,
+            user_id=user_id,
+            batch_size=settings.USERS_PURGE_BATCH_SIZE,
+            pause=settings.USERS_PURGE_PAUSE_SECONDS,
+        )
+
+
+async def remove_user(
+    session: AsyncSession, user: User, background_tasks: BackgroundTasks
+) -> Message:
+    """
+    Delete the user, its items are deleted by the database. Users with many
+    items are only marked deleted and purged in the background.
+    """
+    user_id = user.id
+    if await crud.has_more_items_than_async(
+        session=session, owner_id=user_id, limit=settings.USERS_PURGE_THRESHOLD
+    ):
+        user.deleted_at = datetime.now(timezone.utc)
+        user.is_active = False
+        session.add(user)
+        await session.commit()
+        background_tasks.add_task(purge_deleted_user, user_id)
+        message = "User scheduled for deletion"
+    else:
+        await session.delete(user)
+        await session.commit()
+        message = "User deleted successfully"
+    await crud.revoke_user_tokens_async(session=session, user_id=user_id)
+    return Message(message=message)
+
+
 @router.patch("/me", response_model=UserPublic)
-def update_user_me(
-    *, session: SessionDep, user_in: UserUpdateMe, current_user: CurrentUser
+async def update_user_me(
+    *, session: AsyncSessionDep, user_in: UserUpdateMe, current_user: CurrentUser
 ) -> Any:
     """
     Update own user.
     """
 
     if user_in.email:
-        existing_user = crud.get_user_by_email(session=session, email=user_in.email)
+        existing_user = await crud.get_user_by_email_async(
+            session=session, email=user_in.email
+        )
         if existing_user and existing_user.id != current_user.id:
             raise HTTPException(
                 status_code=409, detail="User with this email already exists"
@@ -92,33 +206,36 @@ def update_user_me(
     user_data = user_in.model_dump(exclude_unset=True)
     current_user.sqlmodel_update(user_data)
     session.add(current_user)
-    session.commit()
-    session.refresh(current_user)
+    await session.commit()
+    invalidate_user_cache(current_user.id)
     return current_user
 
 
 @router.patch("/me/password", response_model=Message)
-def update_password_me(
-    *, session: SessionDep, body: UpdatePassword, current_user: CurrentUser
+async def update_password_me(
+    *, session: AsyncSessionDep, body: UpdatePassword, current_user: CurrentUser
 ) -> Any:
     """
     Update own password.
     """
-    if not verify_password(body.current_password, current_user.hashed_password):
+    if not await verify_password_async(
+        body.current_password, current_user.hashed_password
+    ):
         raise HTTPException(status_code=400, detail="Incorrect password")
     if body.current_password == body.new_password:
         raise HTTPException(
             status_code=400, detail="New password cannot be the same as the current one"
         )
-    hashed_password = get_password_hash(body.new_password)
+    hashed_password = await get_password_hash_async(body.new_password)
     current_user.hashed_password = hashed_password
     session.add(current_user)
-    session.commit()
+    await session.commit()
+    invalidate_user_cache(current_user.id)
     return Message(message="Password updated successfully")
 
 
 @router.get("/me", response_model=UserPublic)
-def read_user_me(current_user: CurrentUser) -> Any:
+async def read_user_me(current_user: CurrentUser) -> Any:
     """
     Get current user.
     """
@@ -126,7 +243,11 @@ def read_user_me(current_user: CurrentUser) -> Any:
 
 
 @router.delete("/me", response_model=Message)
-def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
+async def delete_user_me(
+    session: AsyncSessionDep,
+    current_user: CurrentUser,
+    background_tasks: BackgroundTasks,
+) -> Any:
     """
     Delete own user.
     """
@@ -134,42 +255,52 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    session.delete(current_user)
-    session.commit()
-    return Message(message="User deleted successfully")
+    return await remove_user(session, current_user, background_tasks)
 
 
 @router.post("/signup", response_model=UserPublic)
-def register_user(session: SessionDep, user_in: UserRegister) -> Any:
+async def register_user(session: AsyncSessionDep, user_in: UserRegister) -> Any:
     """
     Create new user without the need to be logged in.
     """
-    user = crud.get_user_by_email(session=session, email=user_in.email)
-    if user:
+    user_create = UserCreate.model_validate(user_in)
+    user = await crud.create_user_async(session=session, user_create=user_create)
+    if not user:
         raise HTTPException(
             status_code=400,
             detail="The user with this email already exists in the system",
         )
-    user_create = UserCreate.model_validate(user_in)
-    user = crud.create_user(session=session, user_create=user_create)
     return user
 
 
 @router.get("/{user_id}", response_model=UserPublic)
-def read_user_by_id(
-    user_id: uuid.UUID, session: SessionDep, current_user: CurrentUser
+async def read_user_by_id(
+    user_id: uuid.UUID,
+    session: ReadSessionDep,
+    current_user: CurrentUser,
+    fields: str | None = None,
 ) -> Any:
     """
-    Get a specific user by id.
+    Get a specific user by id. Pass fields (e.g. id,email) to only get those.
     """
-    user = session.get(User, user_id)
-    if user == current_user:
-        return user
-    if not current_user.is_superuser:
+    requested = parse_fields(fields, UserPublic)
+    options = [] if requested is None else [load_fields(User, requested)]
+    # Users marked deleted are only waiting for their items to be purged
+    statement = (
+        select(User)
+        .where(User.id == user_id, col(User.deleted_at).is_(None))
+        .options(*options)
+    )
+    user = (await session.exec(statement)).first()
+    if not (user and user.id == current_user.id) and not current_user.is_superuser:
         raise HTTPException(
             status_code=403,
             detail="The user doesn't have enough privileges",
         )
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if requested is not None and user is not None:
+        return sparse_response(sparse(user, requested))
     return user
 
 
@@ -178,9 +309,9 @@ def read_user_by_id(
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UserPublic,
 )
-def update_user(
+async def update_user(
     *,
-    session: SessionDep,
+    session: AsyncSessionDep,
     user_id: uuid.UUID,
     user_in: UserUpdate,
 ) -> Any:
@@ -188,39 +319,43 @@ def update_user(
     Update a user.
     """
 
-    db_user = session.get(User, user_id)
-    if not db_user:
+    db_user = await session.get(User, user_id)
+    if not db_user or db_user.deleted_at is not None:
         raise HTTPException(
             status_code=404,
             detail="The user with this id does not exist in the system",
         )
     if user_in.email:
-        existing_user = crud.get_user_by_email(session=session, email=user_in.email)
+        existing_user = await crud.get_user_by_email_async(
+            session=session, email=user_in.email
+        )
         if existing_user and existing_user.id != user_id:
             raise HTTPException(
                 status_code=409, detail="User with this email already exists"
             )
 
-    db_user = crud.update_user(session=session, db_user=db_user, user_in=user_in)
+    db_user = await crud.update_user_async(
+        session=session, db_user=db_user, user_in=user_in
+    )
     return db_user
 
 
 @router.delete("/{user_id}", dependencies=[Depends(get_current_active_superuser)])
-def delete_user(
-    session: SessionDep, current_user: CurrentUser, user_id: uuid.UUID
+async def delete_user(
+    session: AsyncSessionDep,
+    current_user: CurrentUser,
+    user_id: uuid.UUID,
+    background_tasks: BackgroundTasks,
 ) -> Message:
     """
     Delete a user.
     """
-    user = session.get(User, user_id)
-    if not user:
+    user = await session.get(User, user_id)
+    # A user marked deleted is already being purged
+    if not user or user.deleted_at is not None:
         raise HTTPException(status_code=404, detail="User not found")
-    if user == current_user:
+    if user.id == current_user.id:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    statement = delete(Item).where(col(Item.owner_id) == user_id)
-    session.exec(statement)  # type: ignore
-    session.delete(user)
-    session.commit()
-    return Message(message="User deleted successfully")
+    return await remove_user(session, user, background_tasks)
@@ -1,7 +1,13 @@
+import os
+from typing import Any
+
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
 from app.api.deps import get_current_active_superuser
+from app.core.db import async_engine, engine
+from app.core.metrics import metrics
+from app.core.pool import pool_status
 from app.models import Message
 from app.utils import generate_test_email, send_email
 
@@ -26,6 +32,34 @@ def test_email(email_to: EmailStr) -> Message:
     return Message(message="Test email sent")
 
 
+@router.get(
+    "/metrics/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def read_metrics() -> dict[str, Any]:
+    """
+    In-process metrics of the worker that served the request.
+    """
+    return metrics.snapshot()
+
+
+@router.get(
+    "/db-pool/",
+    dependencies=[Depends(get_current_active_superuser)],
+)
+def read_db_pool() -> dict[str, Any]:
+    """
+    Connection pool statistics of the worker that served the request.
+    """
+    return {
+        "pid": os.getpid(),
+        "pools": {
+            "sync": pool_status(engine),
+            "async": pool_status(async_engine.sync_engine),
+        },
+    }
+
+
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
@@ -0,0 +1,94 @@
+"""
+Compare the throughput of a sync and an async handler running the same
+owner-scoped item listing, at high concurrency, against the configured DB.
+
+    python -m app.benchmarks.async_vs_sync --requests 2000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+from sqlmodel import Session, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import async_engine, engine
+from app.models import Item, User
+
+bench_app = FastAPI()
+
+
+def _statements(owner_id: Any) -> tuple[Any, Any]:
+    count_statement = (
+        select(func.count()).select_from(Item).where(Item.owner_id == owner_id)
+    )
+    statement = select(Item).where(Item.owner_id == owner_id).limit(100)
+    return count_statement, statement
+
+
+@bench_app.get("/sync")
+def sync_items() -> int:
+    with Session(engine) as session:
+        owner_id = session.exec(select(User.id)).first()
+        count_statement, statement = _statements(owner_id)
+        session.exec(count_statement).one()
+        return len(session.exec(statement).all())
+
+
+@bench_app.get("/async")
+async def async_items() -> int:
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        owner_id = (await session.exec(select(User.id))).first()
+        count_statement, statement = _statements(owner_id)
+        (await session.exec(count_statement)).one()
+        return len((await session.exec(statement)).all())
+
+
+async def run(path: str, requests: int, concurrency: int) -> None:
+    transport = httpx.ASGITransport(app=bench_app)
+    latencies: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def one() -> None:
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                r = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                if r.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    await async_engine.dispose()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"{path:<7} {requests / elapsed:>10.1f} req/s "
+        f"p50 {statistics.median(latencies) * 1000:>8.1f} ms "
+        f"p99 {p99 * 1000:>8.1f} ms errors {errors}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    for path in ("/sync", "/async"):
+        asyncio.run(run(path, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
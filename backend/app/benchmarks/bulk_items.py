@@ -0,0 +1,63 @@
+"""
+Compare the throughput of creating items one by one, like a client calling
+POST /items/ in a loop (validate, insert, commit), with the bulk creation of
+POST /items/bulk (COPY on Postgres), against the configured DB. A temporary
+user is created with the items and deleted at the end.
+
+    python -m app.benchmarks.bulk_items --items 20000 --batch-size 5000
+"""
+
+import argparse
+import time
+from typing import Any
+
+from sqlmodel import Session, col, delete
+
+from app import crud
+from app.benchmarks.pagination import create_owner
+from app.core.db import engine
+from app.models import Item, ItemCreate, User
+
+
+def one_by_one(session: Session, owner_id: Any, items: list[ItemCreate]) -> None:
+    for item_in in items:
+        session.add(Item.model_validate(item_in, update={"owner_id": owner_id}))
+        session.commit()
+
+
+def bulk(
+    session: Session, owner_id: Any, items: list[ItemCreate], batch_size: int
+) -> None:
+    crud.create_items_bulk(
+        session=session, items_create=items, owner_id=owner_id, batch_size=batch_size
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    items = [
+        ItemCreate(title=f"item {n}", description="imported") for n in range(args.items)
+    ]
+    owner_id = create_owner(0)
+    try:
+        with Session(engine) as session:
+            start = time.perf_counter()
+            one_by_one(session, owner_id, items)
+            loop = args.items / (time.perf_counter() - start)
+            print(f"{'one by one':<12} {loop:>10.1f} items/s")
+
+            start = time.perf_counter()
+            bulk(session, owner_id, items, args.batch_size)
+            rate = args.items / (time.perf_counter() - start)
+            print(f"{'bulk':<12} {rate:>10.1f} items/s ({rate / loop:.1f}x)")
+    finally:
+        with Session(engine) as session:
+            session.exec(delete(User).where(col(User.id) == owner_id))  # type: ignore
+            session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Export the items of a user with many items, streamed from a server side cursor
+as GET /items/export does, then loaded and encoded all at once, and compare
+the peak RSS of the process and the time taken, against the configured DB. A
+temporary user is created with the items and deleted at the end.
+
+    python -m app.benchmarks.export --items 1000000 --format ndjson
+"""
+
+import argparse
+import asyncio
+import resource
+import time
+from typing import Any
+
+from sqlmodel import Session, col, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.benchmarks.pagination import create_owner
+from app.bulk import BulkFormat
+from app.core.db import async_engine, engine
+from app.export import EXPORT_COLUMNS, encode_rows, export_items
+from app.models import Item, User
+
+
+def peak_rss_mb() -> float:
+    # KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def streamed(owner_id: Any, format: BulkFormat, batch_size: int) -> int:
+    size = 0
+    async for chunk in export_items(
+        owner_id=owner_id, format=format, batch_size=batch_size
+    ):
+        size += len(chunk)
+    return size
+
+
+async def buffered(owner_id: Any, format: BulkFormat, _: int) -> int:
+    statement = select(*(getattr(Item, name) for name in EXPORT_COLUMNS)).where(
+        Item.owner_id == owner_id
+    )
+    async with AsyncSession(async_engine) as session:
+        rows = (await session.exec(statement.order_by(col(Item.id)))).all()
+    return len(encode_rows(rows, format))
+
+
+async def measure(owner_id: Any, format: BulkFormat, batch_size: int) -> None:
+    # Peak RSS only grows, the streamed export has to run first
+    print(f"{'export':<10} {'seconds':>8} {'MB out':>8} {'peak RSS MB':>12}")
+    for name, export in (("streamed", streamed), ("buffered", buffered)):
+        start = time.perf_counter()
+        size = await export(owner_id, format, batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10} {elapsed:>8.1f} {size / 2**20:>8.1f} {peak_rss_mb():>12.1f}")
+    await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    owner_id = create_owner(args.items)
+    print(f"peak RSS before exporting: {peak_rss_mb():.1f} MB")
+    try:
+        asyncio.run(measure(owner_id, args.format, args.batch_size))
+    finally:
+        with Session(engine) as session:
+            session.exec(delete(User).where(col(User.id) == owner_id))  # type: ignore
+            session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Compare per-owner item listing and count latency on a plain heap table and on
+a table hash partitioned by owner_id, like item, against the configured
+Postgres DB. Both are loaded with the same rows and dropped at the end.
+
+    python -m app.benchmarks.item_partitioning --rows 2000000 --owners 2000
+"""
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from sqlalchemy import Connection, text
+
+from app.core.db import engine
+from app.core.dialect import IS_POSTGRES
+from app.core.ids import uuid7
+
+COLUMNS = "id uuid NOT NULL, owner_id uuid NOT NULL, title varchar(255) NOT NULL"
+
+
+def create_tables(conn: Connection, partitions: int) -> None:
+    conn.execute(text("DROP TABLE IF EXISTS bench_item_heap, bench_item_hash"))
+    conn.execute(text(f"CREATE TABLE bench_item_heap ({COLUMNS}, PRIMARY KEY (id))"))
+    conn.execute(
+        text(
+            f"CREATE TABLE bench_item_hash ({COLUMNS}, PRIMARY KEY (id, owner_id)) "
+            "PARTITION BY HASH (owner_id)"
+        )
+    )
+    for remainder in range(partitions):
+        conn.execute(
+            text(
+                f"CREATE TABLE bench_item_hash_p{remainder} "
+                "PARTITION OF bench_item_hash "
+                f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+            )
+        )
+    for table in ("bench_item_heap", "bench_item_hash"):
+        conn.execute(text(f"CREATE INDEX ON {table} (owner_id)"))
+    conn.commit()
+
+
+def load(conn: Connection, owners: list[uuid.UUID], rows: int) -> None:
+    batch_size = 10_000
+    for offset in range(0, rows, batch_size):
+        batch = [
+            {"id": uuid7(), "owner_id": random.choice(owners), "title": f"item {n}"}
+            for n in range(offset, min(offset + batch_size, rows))
+        ]
+        for table in ("bench_item_heap", "bench_item_hash"):
+            conn.execute(
+                text(
+                    f"INSERT INTO {table} (id, owner_id, title) "
+                    "VALUES (:id, :owner_id, :title)"
+                ),
+                batch,
+            )
+        conn.commit()
+    conn.execute(text("ANALYZE bench_item_heap, bench_item_hash"))
+    conn.commit()
+
+
+def measure(
+    conn: Connection, table: str, owners: list[uuid.UUID], queries: int
+) -> None:
+    count = text(f"SELECT count(*) FROM {table} WHERE owner_id = :owner_id")
+    listing = text(
+        f"SELECT * FROM {table} WHERE owner_id = :owner_id "
+        "ORDER BY id OFFSET 0 LIMIT 100"
+    )
+    for name, statement in (("count", count), ("list", listing)):
+        latencies = []
+        for _ in range(queries):
+            start = time.perf_counter()
+            conn.execute(statement, {"owner_id": random.choice(owners)}).all()
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(
+            f"{table:<16} {name:<5} "
+            f"p50 {statistics.median(latencies) * 1000:>7.2f} ms "
+            f"p99 {p99 * 1000:>7.2f} ms"
+        )
+    size = conn.execute(
+        text(
+            "SELECT sum(pg_total_relation_size(relid)) "
+            "FROM pg_partition_tree(:table)"
+        ),
+        {"table": table},
+    ).scalar_one()
+    print(f"{table:<16} size  {size / 1024 / 1024:>7.1f} MiB")
+
+
+def main() -> None:
+    if not IS_POSTGRES:
+        raise SystemExit("This benchmark needs Postgres (partitioning)")
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--owners", type=int, default=2000)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+    owners = [uuid.uuid4() for _ in range(args.owners)]
+    with engine.connect() as conn:
+        create_tables(conn, args.partitions)
+        try:
+            load(conn, owners, args.rows)
+            for table in ("bench_item_heap", "bench_item_hash"):
+                measure(conn, table, owners, args.queries)
+        finally:
+            conn.rollback()
+            conn.execute(text("DROP TABLE bench_item_heap, bench_item_hash"))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare the latency of a first page of items with its total count fetched in
+two statements (the count, then the page) and in one (the count as a scalar
+subquery of the page query), for the owner scoped and the superuser listings,
+against the configured DB. A temporary user is created with the items and
+deleted at the end.
+
+    python -m app.benchmarks.list_queries --items 100000 --page-size 100
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any
+
+from sqlmodel import Session, col, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import crud
+from app.api.pagination import paginate
+from app.benchmarks.pagination import create_owner
+from app.core.db import async_engine, engine
+from app.models import Item, User
+
+
+async def two_statements(
+    session: AsyncSession, owner_id: Any, statement: Any, page_size: int
+) -> None:
+    (await session.exec(crud.item_count_statement(owner_id))).one()
+    page = paginate(statement, Item.id, cursor=None, skip=0, limit=page_size)
+    (await session.exec(page)).all()
+
+
+async def one_statement(
+    session: AsyncSession, owner_id: Any, statement: Any, page_size: int
+) -> None:
+    total = crud.item_count_statement(owner_id).correlate(None).scalar_subquery()
+    page = paginate(statement, Item.id, cursor=None, skip=0, limit=page_size)
+    (await session.exec(page.add_columns(total))).all()
+
+
+async def measure(owner_id: Any, page_size: int, repeat: int) -> None:
+    paths = {
+        "owner": (owner_id, select(Item).where(Item.owner_id == owner_id)),
+        "superuser": (None, select(Item)),
+    }
+    print(f"{'path':<10} {'2 statements p50':>17} {'1 statement p50':>16}")
+    async with AsyncSession(async_engine) as session:
+        for name, (scope, statement) in paths.items():
+            results = []
+            for fetch in (two_statements, one_statement):
+                latencies = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    await fetch(session, scope, statement, page_size)
+                    latencies.append(time.perf_counter() - start)
+                    # Like a request, each listing runs in its own transaction
+                    await session.commit()
+                results.append(statistics.median(latencies) * 1000)
+            print(f"{name:<10} {results[0]:>14.2f} ms {results[1]:>13.2f} ms")
+    await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    owner_id = create_owner(args.items)
+    try:
+        asyncio.run(measure(owner_id, args.page_size, args.repeat))
+    finally:
+        with Session(engine) as session:
+            session.exec(delete(User).where(col(User.id) == owner_id))  # type: ignore
+            session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compare the latency of page N of an owner's items with offset pagination and
+with keyset (cursor) pagination, against the configured DB. A temporary user
+is created with the items and deleted at the end.
+
+    python -m app.benchmarks.pagination --items 200000 --page-size 100
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any
+
+from sqlalchemy import insert
+from sqlmodel import Session, col, delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.pagination import encode_cursor, page, paginate
+from app.core.db import async_engine, engine
+from app.core.ids import uuid7
+from app.core.security import get_password_hash
+from app.models import Item, User
+
+
+def create_owner(items: int) -> Any:
+    with Session(engine) as session:
+        owner = User(
+            email=f"bench-{uuid7().hex}@example.com",
+            hashed_password=get_password_hash("correct horse battery staple"),
+        )
+        session.add(owner)
+        session.commit()
+        for offset in range(0, items, 10_000):
+            rows = [
+                {"id": uuid7(), "owner_id": owner.id, "title": f"item {n}"}
+                for n in range(offset, min(offset + 10_000, items))
+            ]
+            session.exec(insert(Item).values(rows))  # type: ignore
+            session.commit()
+        return owner.id
+
+
+async def measure(owner_id: Any, items: int, page_size: int, repeat: int) -> None:
+    pages = [1, 10, 100, 1000, items // page_size]
+    pages = sorted({n for n in pages if 0 < n <= items // page_size})
+    async with AsyncSession(async_engine) as session:
+        # The cursor of page N is the last id of page N - 1, look them up once
+        cursors: dict[int, str | None] = {}
+        for n in pages:
+            if n == 1:
+                cursors[n] = None
+                continue
+            last_id = (
+                await session.exec(
+                    select(Item.id)
+                    .where(Item.owner_id == owner_id)
+                    .order_by(col(Item.id))
+                    .offset((n - 1) * page_size - 1)
+                    .limit(1)
+                )
+            ).one()
+            cursors[n] = encode_cursor(last_id)
+
+        print(f"{'page':>6} {'offset p50':>12} {'cursor p50':>12}")
+        for n in pages:
+            results = []
+            for cursor in (None, cursors[n]):
+                latencies = []
+                for _ in range(repeat):
+                    statement = paginate(
+                        select(Item).where(Item.owner_id == owner_id),
+                        Item.id,
+                        cursor=cursor,
+                        skip=(n - 1) * page_size,
+                        limit=page_size,
+                    )
+                    start = time.perf_counter()
+                    rows = (await session.exec(statement)).all()
+                    page(rows, page_size)
+                    latencies.append(time.perf_counter() - start)
+                results.append(statistics.median(latencies) * 1000)
+            print(f"{n:>6} {results[0]:>9.2f} ms {results[1]:>9.2f} ms")
+    await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    owner_id = create_owner(args.items)
+    try:
+        asyncio.run(measure(owner_id, args.items, args.page_size, args.repeat))
+    finally:
+        with Session(engine) as session:
+            session.exec(delete(User).where(col(User.id) == owner_id))  # type: ignore
+            session.commit()
+
+
+if __name__ == "__main__":
+    main()
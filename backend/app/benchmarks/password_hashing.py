@@ -0,0 +1,74 @@
+"""
+Measure password hash and verify latency for candidate settings on this host.
+
+    python -m app.benchmarks.password_hashing --bcrypt-rounds 10 11 12 13
+"""
+
+import argparse
+import importlib.util
+import statistics
+import time
+
+from app.core.security import build_crypt_context
+
+PASSWORD = "correct horse battery staple"
+
+
+def measure(*, scheme: str, iterations: int, **costs: int) -> tuple[float, float]:
+    context = build_crypt_context(
+        scheme=scheme,
+        bcrypt_rounds=costs.get("bcrypt_rounds", 12),
+        argon2_memory_cost=costs.get("argon2_memory_cost", 65536),
+        argon2_time_cost=costs.get("argon2_time_cost", 3),
+        argon2_parallelism=costs.get("argon2_parallelism", 4),
+    )
+    hash_times = []
+    verify_times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        hashed = context.hash(PASSWORD)
+        hash_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        context.verify(PASSWORD, hashed)
+        verify_times.append(time.perf_counter() - start)
+    return statistics.median(hash_times), statistics.median(verify_times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument(
+        "--bcrypt-rounds", type=int, nargs="*", default=[10, 11, 12, 13, 14]
+    )
+    parser.add_argument(
+        "--argon2-memory-cost", type=int, nargs="*", default=[19456, 65536]
+    )
+    parser.add_argument("--argon2-time-cost", type=int, nargs="*", default=[2, 3])
+    args = parser.parse_args()
+
+    candidates: list[tuple[str, dict[str, int]]] = [
+        ("bcrypt", {"bcrypt_rounds": rounds}) for rounds in args.bcrypt_rounds
+    ]
+    if importlib.util.find_spec("argon2") is not None:
+        candidates += [
+            ("argon2", {"argon2_memory_cost": memory, "argon2_time_cost": t})
+            for memory in args.argon2_memory_cost
+            for t in args.argon2_time_cost
+        ]
+    else:
+        print("argon2-cffi is not installed, skipping argon2 candidates")
+
+    print(f"{'scheme':<8} {'settings':<40} {'hash ms':>10} {'verify ms':>10}")
+    for scheme, costs in candidates:
+        hash_time, verify_time = measure(
+            scheme=scheme, iterations=args.iterations, **costs
+        )
+        params = ", ".join(f"{k}={v}" for k, v in costs.items())
+        print(
+            f"{scheme:<8} {params:<40} "
+            f"{hash_time * 1000:>10.1f} {verify_time * 1000:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Compare the latency of the hottest queries with and without server side
+prepared statements, against the configured DB (it needs at least one user).
+
+    python -m app.benchmarks.prepared_statements --iterations 5000
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+from typing import Any
+
+from sqlmodel import Session, create_engine, func, select
+
+from app import crud
+from app.core.config import settings
+from app.core.dialect import IS_POSTGRES
+from app.models import Item, User
+
+
+def _queries(session: Session, user: User) -> dict[str, Callable[[], Any]]:
+    return {
+        "get_user_by_email": lambda: crud.get_user_by_email(
+            session=session, email=user.email
+        ),
+        "get_user": lambda: session.get(User, user.id, populate_existing=True),
+        "count_items": lambda: session.exec(
+            select(func.count()).select_from(Item).where(Item.owner_id == user.id)
+        ).one(),
+        "list_items": lambda: session.exec(
+            select(Item).where(Item.owner_id == user.id).offset(0).limit(100)
+        ).all(),
+        "count_users": lambda: session.exec(
+            select(func.count()).select_from(User)
+        ).one(),
+    }
+
+
+def run(prepare_threshold: int | None, iterations: int) -> None:
+    engine = create_engine(
+        str(settings.SQLALCHEMY_DATABASE_URI),
+        connect_args={"prepare_threshold": prepare_threshold},
+        pool_size=1,
+    )
+    print(f"prepare_threshold={prepare_threshold}")
+    with Session(engine) as session:
+        user = session.exec(select(User)).first()
+        if user is None:
+            raise SystemExit("No user in the database")
+        for name, query in _queries(session, user).items():
+            # Warm up the connection, SQLAlchemy's compiled cache and, when
+            # enabled, prepare the statement
+            for _ in range(10):
+                query()
+            latencies = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                query()
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            p99 = latencies[int(len(latencies) * 0.99) - 1]
+            print(
+                f"  {name:<18} mean {statistics.mean(latencies) * 1e6:>8.1f} us "
+                f"p50 {statistics.median(latencies) * 1e6:>8.1f} us "
+                f"p99 {p99 * 1e6:>8.1f} us"
+            )
+    engine.dispose()
+
+
+def main() -> None:
+    if not IS_POSTGRES:
+        raise SystemExit("This benchmark needs Postgres (prepared statements)")
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    for prepare_threshold in (None, 0):
+        run(prepare_threshold, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
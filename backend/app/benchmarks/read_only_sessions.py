@@ -0,0 +1,96 @@
+"""
+Compare a regular read-write session with the autocommit, no autoflush session
+used by the read-only endpoints, running the item listing of read_items against
+the configured DB. Reports request latency and how long each request holds its
+pooled connection.
+
+    python -m app.benchmarks.read_only_sessions --requests 5000 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.db import async_engine, async_read_engine
+from app.models import Item, User
+
+
+def _percentiles(values: list[float]) -> str:
+    values = sorted(values)
+    p99 = values[int(len(values) * 0.99) - 1]
+    return (
+        f"p50 {statistics.median(values) * 1000:>7.2f} ms " f"p99 {p99 * 1000:>7.2f} ms"
+    )
+
+
+async def run(name: str, bind: AsyncEngine, requests: int, concurrency: int) -> None:
+    read_only = bind is async_read_engine
+    checked_out: dict[int, float] = {}
+    hold_times: list[float] = []
+
+    def on_checkout(dbapi_conn: Any, *_: Any) -> None:
+        checked_out[id(dbapi_conn)] = time.perf_counter()
+
+    def on_checkin(dbapi_conn: Any, *_: Any) -> None:
+        start = checked_out.pop(id(dbapi_conn), None)
+        if start is not None:
+            hold_times.append(time.perf_counter() - start)
+
+    pool = async_engine.sync_engine.pool
+    event.listen(pool, "checkout", on_checkout)
+    event.listen(pool, "checkin", on_checkin)
+
+    async with AsyncSession(async_engine) as session:
+        owner_id = (await session.exec(select(User.id))).first()
+
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            async with AsyncSession(
+                bind, expire_on_commit=False, autoflush=not read_only
+            ) as session:
+                count_statement = (
+                    select(func.count())
+                    .select_from(Item)
+                    .where(Item.owner_id == owner_id)
+                )
+                (await session.exec(count_statement)).one()
+                statement = select(Item).where(Item.owner_id == owner_id).limit(100)
+                (await session.exec(statement)).all()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    event.remove(pool, "checkout", on_checkout)
+    event.remove(pool, "checkin", on_checkin)
+    await async_engine.dispose()
+
+    print(
+        f"{name:<10} {requests / elapsed:>9.1f} req/s "
+        f"latency {_percentiles(latencies)} "
+        f"connection held {_percentiles(hold_times)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    for name, bind in (("read-write", async_engine), ("read-only", async_read_engine)):
+        asyncio.run(run(name, bind, args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Compare the signup write path before and after: look up the email then insert,
+against a single INSERT ... ON CONFLICT DO NOTHING RETURNING. Passwords are
+hashed once up front so only the DB work is measured, against the configured
+DB. A share of the signups reuse an email (in another case) to hit conflicts.
+
+    python -m app.benchmarks.signup --signups 5000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+
+from sqlmodel import col, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import crud
+from app.core.db import async_engine
+from app.core.dialect import insert
+from app.core.security import get_password_hash
+from app.models import User, UserCreate
+
+
+async def lookup_then_insert(session: AsyncSession, row: dict[str, object]) -> bool:
+    email = str(row["email"])
+    if await crud.get_user_by_email_async(session=session, email=email):
+        return False
+    session.add(User(**row))
+    await session.commit()
+    return True
+
+
+async def insert_on_conflict(session: AsyncSession, row: dict[str, object]) -> bool:
+    statement = (
+        insert(User)
+        .values(**row)
+        .on_conflict_do_nothing(index_elements=crud.EMAIL_CONFLICT_TARGET)
+        .returning(User)
+    )
+    created = (await session.exec(statement)).first()
+    await session.commit()
+    return created is not None
+
+
+async def run(
+    name: str,
+    signup: Callable[[AsyncSession, dict[str, object]], Awaitable[bool]],
+    signups: int,
+    concurrency: int,
+    duplicates: float,
+) -> None:
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    hashed_password = get_password_hash("correct horse battery staple")
+    emails = [f"{prefix}-{n}@example.com" for n in range(signups)]
+    semaphore = asyncio.Semaphore(concurrency)
+    created = 0
+
+    async def one(n: int) -> None:
+        nonlocal created
+        email = emails[n]
+        if n and random.random() < duplicates:
+            email = emails[random.randrange(n)].upper()
+        user = UserCreate(email=email, password="unused-password")
+        row = User.model_validate(
+            user, update={"hashed_password": hashed_password}
+        ).model_dump()
+        async with semaphore:
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                try:
+                    created += await signup(session, row)
+                except Exception:
+                    # The lookup races with concurrent duplicates, the unique
+                    # index rejects the insert
+                    pass
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(signups)))
+    elapsed = time.perf_counter() - start
+    async with AsyncSession(async_engine) as session:
+        statement = delete(User).where(col(User.email).ilike(f"{prefix}-%"))
+        await session.exec(statement)  # type: ignore
+        await session.commit()
+    await async_engine.dispose()
+    print(
+        f"{name:<20} {signups / elapsed:>9.1f} signups/s, "
+        f"{created} created, {signups - created} rejected"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--signups", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duplicates", type=float, default=0.1)
+    args = parser.parse_args()
+    for name, signup in (
+        ("lookup then insert", lookup_then_insert),
+        ("insert on conflict", insert_on_conflict),
+    ):
+        asyncio.run(run(name, signup, args.signups, args.concurrency, args.duplicates))
+
+
+if __name__ == "__main__":
+    main()
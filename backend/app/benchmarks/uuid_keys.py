@@ -0,0 +1,72 @@
+"""
+Compare random (v4) and time ordered (v7) UUID primary keys: insert throughput
+into an item-like table and the size of its primary key index afterwards, on
+the configured DB. The tables are dropped at the end.
+
+    python -m app.benchmarks.uuid_keys --rows 1000000 --batch-size 1000
+"""
+
+import argparse
+import time
+import uuid
+from collections.abc import Callable
+
+from sqlalchemy import text
+
+from app.core.db import engine
+from app.core.dialect import IS_POSTGRES
+from app.core.ids import uuid7
+
+
+def run(
+    name: str, make_id: Callable[[], uuid.UUID], rows: int, batch_size: int
+) -> None:
+    table = f"bench_{name}"
+    owner_id = uuid.uuid4()
+    insert = text(
+        f"INSERT INTO {table} (id, owner_id, title) VALUES (:id, :owner_id, :title)"
+    )
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        conn.execute(
+            text(
+                f"CREATE TABLE {table} "
+                "(id uuid PRIMARY KEY, owner_id uuid NOT NULL, title varchar(255))"
+            )
+        )
+        conn.commit()
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            conn.execute(
+                insert,
+                [
+                    {"id": make_id(), "owner_id": owner_id, "title": f"item {n}"}
+                    for n in range(offset, min(offset + batch_size, rows))
+                ],
+            )
+            conn.commit()
+        elapsed = time.perf_counter() - start
+        index_size = conn.execute(
+            text(f"SELECT pg_relation_size('{table}_pkey')")
+        ).scalar_one()
+        conn.execute(text(f"DROP TABLE {table}"))
+        conn.commit()
+    print(
+        f"{name}: {rows / elapsed:>10.1f} rows/s "
+        f"primary key index {index_size / 1024 / 1024:>8.1f} MiB"
+    )
+
+
+def main() -> None:
+    if not IS_POSTGRES:
+        raise SystemExit("This benchmark needs Postgres (index sizes)")
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    run("uuid4", uuid.uuid4, args.rows, args.batch_size)
+    run("uuid7", uuid7, args.rows, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
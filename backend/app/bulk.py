@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+import time
+import uuid
+from collections.abc import Iterator
+from typing import Any, Literal
+
+from pydantic import ValidationError
+from sqlmodel import Session
+
+from app import crud
+from app.models import (
+    ItemBulkResult,
+    ItemCreate,
+    ItemsBulkPublic,
+    UserBulkResult,
+    UserCreate,
+    UsersBulkPublic,
+)
+
+BulkFormat = Literal["ndjson", "csv"]
+
+
+class TooManyRows(ValueError):
+    pass
+
+
+def iter_records(
+    content: str, format: BulkFormat
+) -> Iterator[tuple[int, dict[str, Any] | None, str | None]]:
+    """
+    Yield (row number, record, parse error) for every non empty row.
+
+    CSV rows use the header as keys, empty cells are left out so that model
+    defaults apply.
+    """
+    if format == "csv":
+        reader = csv.DictReader(io.StringIO(content))
+        for row, record in enumerate(reader, start=1):
+            yield row, {k: v for k, v in record.items() if k and v != ""}, None
+        return
+    for row, line in enumerate(content.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield row, None, "Expected a JSON object"
+            continue
+        yield row, record, None
+
+
+def describe_errors(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+    )
+
+
+def create_users_bulk(
+    *,
+    session: Session,
+    content: str,
+    format: BulkFormat,
+    batch_size: int,
+    max_rows: int | None = None,
+) -> UsersBulkPublic:
+    start = time.perf_counter()
+    results: list[UserBulkResult] = []
+    valid: list[tuple[UserBulkResult, UserCreate]] = []
+    for row, record, error in iter_records(content, format):
+        result = UserBulkResult(row=row, status="invalid", error=error)
+        results.append(result)
+        if max_rows is not None and len(results) > max_rows:
+            raise TooManyRows(f"At most {max_rows} rows can be created per request")
+        if record is None:
+            continue
+        result.email = record.get("email")
+        try:
+            valid.append((result, UserCreate.model_validate(record)))
+        except ValidationError as e:
+            result.error = describe_errors(e)
+
+    ids = crud.create_users_bulk(
+        session=session,
+        users_create=[user_create for _, user_create in valid],
+        batch_size=batch_size,
+    )
+    for (result, _), user_id in zip(valid, ids, strict=True):
+        if user_id is None:
+            result.status = "duplicate"
+            result.error = "The user with this email already exists in the system"
+        else:
+            result.status = "created"
+            result.id = user_id
+
+    elapsed = time.perf_counter() - start
+    created = sum(1 for result in results if result.status == "created")
+    return UsersBulkPublic(
+        data=results,
+        created=created,
+        failed=len(results) - created,
+        elapsed_seconds=round(elapsed, 3),
+        rows_per_second=round(len(results) / elapsed, 1) if elapsed else 0.0,
+    )
+
+
+def create_items_bulk(
+    *,
+    session: Session,
+    content: str,
+    format: BulkFormat,
+    owner_id: uuid.UUID,
+    batch_size: int,
+    max_rows: int | None = None,
+) -> ItemsBulkPublic:
+    """
+    Validate every row first, then create the valid ones in a single
+    transaction.
+    """
+    start = time.perf_counter()
+    results: list[ItemBulkResult] = []
+    valid: list[tuple[ItemBulkResult, ItemCreate]] = []
+    for row, record, error in iter_records(content, format):
+        result = ItemBulkResult(row=row, status="invalid", error=error)
+        results.append(result)
+        if max_rows is not None and len(results) > max_rows:
+            raise TooManyRows(f"At most {max_rows} items can be created per request")
+        if record is None:
+            continue
+        try:
+            valid.append((result, ItemCreate.model_validate(record)))
+        except ValidationError as e:
+            result.error = describe_errors(e)
+
+    ids = crud.create_items_bulk(
+        session=session,
+        items_create=[item_create for _, item_create in valid],
+        owner_id=owner_id,
+        batch_size=batch_size,
+    )
+    for (result, _), item_id in zip(valid, ids, strict=True):
+        result.status = "created"
+        result.id = item_id
+
+    elapsed = time.perf_counter() - start
+    return ItemsBulkPublic(
+        data=results,
+        created=len(ids),
+        failed=len(results) - len(ids),
+        elapsed_seconds=round(elapsed, 3),
+        rows_per_second=round(len(results) / elapsed, 1) if elapsed else 0.0,
+    )
@@ -33,8 +33,17 @@ class Settings(BaseSettings):
     )
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str = secrets.token_urlsafe(32)
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     # 60 minutes * 24 hours * 8 days = 8 days
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # How often each worker reloads revoked token epochs, bounds how long a
+    # logout or deactivation takes to apply on other workers
+    TOKEN_EPOCH_REFRESH_SECONDS: int = 5
+    # Resolved users are cached per worker for at most this long (and never
+    # past the token expiration), other workers only see changes after it
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    # Set to 0 to disable the cache
+    AUTH_CACHE_MAX_SIZE: int = 10_000
     FRONTEND_HOST: str = "http://localhost:5173"
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
 
@@ -51,15 +60,20 @@ class Settings(BaseSettings):
 
     PROJECT_NAME: str
     SENTRY_DSN: HttpUrl | None = None
-    POSTGRES_SERVER: str
+    # Overrides the POSTGRES_* settings, e.g. sqlite:///./app.db to run without
+    # Postgres (it needs the "sqlite" extra, aiosqlite, for the async engine)
+    DATABASE_URL: str | None = None
+    POSTGRES_SERVER: str = "localhost"
     POSTGRES_PORT: int = 5432
-    POSTGRES_USER: str
+    POSTGRES_USER: str = "postgres"
     POSTGRES_PASSWORD: str = ""
     POSTGRES_DB: str = ""
 
     @computed_field  # type: ignore[prop-decorator]
     @property
-    def SQLALCHEMY_DATABASE_URI(self) -> PostgresDsn:
+    def SQLALCHEMY_DATABASE_URI(self) -> PostgresDsn | str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return MultiHostUrl.build(
             scheme="postgresql+psycopg",
             username=self.POSTGRES_USER,
@@ -69,6 +83,60 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )
 
+    # Hosts of streaming replicas serving the read-only GET endpoints, with the
+    # same port, credentials and database as the primary
+    POSTGRES_REPLICA_SERVERS: Annotated[
+        list[str] | str, BeforeValidator(parse_cors)
+    ] = []
+    # Replicas lagging behind the primary by more than this are skipped
+    REPLICA_MAX_LAG_SECONDS: float = 5
+    REPLICA_CHECK_INTERVAL_SECONDS: float = 5
+    # Replicas that don't accept a connection (or answer the lag check) within
+    # this many seconds are skipped, instead of stalling the reads
+    REPLICA_CONNECT_TIMEOUT_SECONDS: int = 2
+    # Reads go to the primary for this long after a user wrote something. Users
+    # are tracked in each worker's memory, a read handled by another worker than
+    # the write may still go to a replica
+    READ_YOUR_WRITES_SECONDS: int = 5
+    READ_YOUR_WRITES_MAX_USERS: int = 100_000
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def SQLALCHEMY_REPLICA_DATABASE_URIS(self) -> list[PostgresDsn]:
+        return [
+            MultiHostUrl.build(
+                scheme="postgresql+psycopg",
+                username=self.POSTGRES_USER,
+                password=self.POSTGRES_PASSWORD,
+                host=host,
+                port=self.POSTGRES_PORT,
+                path=self.POSTGRES_DB,
+            )
+            for host in self.POSTGRES_REPLICA_SERVERS
+        ]
+
+    # Connection pool of each engine (sync and async) in every worker, "null"
+    # opens a connection per checkout, e.g. behind PgBouncer
+    DB_POOL_CLASS: Literal["queue", "null"] = "queue"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Seconds to wait for a connection before failing with a 503
+    DB_POOL_TIMEOUT: float = 30
+    # Seconds after which connections are replaced, -1 to keep them
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Executions of the same query on a connection before it's prepared server
+    # side, 0 prepares every query and None disables prepared statements
+    DB_PREPARE_THRESHOLD: int | None = 5
+    # Behind PgBouncer in transaction pooling mode, disables prepared statements
+    DB_PGBOUNCER_TRANSACTION_POOLING: bool = False
+    # statement_timeout of every connection in milliseconds, 0 disables it
+    DB_STATEMENT_TIMEOUT_MS: int = 30_000
+    # Budgets of the routes that need another one, by endpoint name, e.g.
+    # {"read_items": 2000}. An X-Request-Deadline header (a Unix timestamp) can
+    # tighten them further
+    DB_ROUTE_STATEMENT_TIMEOUTS_MS: dict[str, int] = {}
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -91,6 +159,51 @@ class Settings(BaseSettings):
     def emails_enabled(self) -> bool:
         return bool(self.SMTP_HOST and self.EMAILS_FROM_EMAIL)
 
+    # Hashes made with another scheme or cost are upgraded on the next login.
+    # argon2 needs the "argon2" extra (argon2-cffi) installed
+    PASSWORD_HASH_SCHEME: Literal["bcrypt", "argon2"] = "bcrypt"
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    # Memory in KiB
+    PASSWORD_ARGON2_MEMORY_COST: int = 65536
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_PARALLELISM: int = 4
+    # Number of processes used for bcrypt hashing and verification in each
+    # worker, 0 runs hashing inline in the calling thread
+    PASSWORD_HASH_WORKERS: int = 0
+
+    # Sliding window limits for login and password recovery. Limits are kept in
+    # each worker's memory unless RATE_LIMIT_STORAGE_URL points to a shared
+    # backend, e.g. redis://redis:6379/0
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_STORAGE_URL: str | None = None
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    LOGIN_RATE_LIMIT_PER_IP: int = 20
+    LOGIN_RATE_LIMIT_PER_USERNAME: int = 5
+    PASSWORD_RECOVERY_RATE_LIMIT_PER_IP: int = 5
+    PASSWORD_RECOVERY_RATE_LIMIT_PER_EMAIL: int = 3
+
+    # Hash partitions of the item table (by owner_id), read by the migration
+    # that creates them, changing it later means repartitioning
+    ITEM_PARTITIONS: int = 16
+
+    USERS_BULK_MAX_ROWS: int = 10_000
+    USERS_BULK_BATCH_SIZE: int = 1000
+    ITEMS_BULK_MAX_ROWS: int = 50_000
+    # Rows per COPY (or INSERT) of a bulk item creation, all in one transaction
+    ITEMS_BULK_BATCH_SIZE: int = 5000
+    # Bulk updates and deletes write at most this many items per request, in
+    # statements of ITEMS_BULK_WRITE_BATCH_SIZE items
+    ITEMS_BULK_WRITE_MAX_ROWS: int = 10_000
+    ITEMS_BULK_WRITE_BATCH_SIZE: int = 1000
+    # Rows fetched from the server side cursor and encoded at a time by exports
+    ITEMS_EXPORT_BATCH_SIZE: int = 1000
+
+    # Users with more items than this are marked deleted right away and their
+    # items purged in the background, in batches with a pause in between
+    USERS_PURGE_THRESHOLD: int = 10_000
+    USERS_PURGE_BATCH_SIZE: int = 5000
+    USERS_PURGE_PAUSE_SECONDS: float = 0.1
+
     EMAIL_TEST_USER: EmailStr = "test@example.com"
     FIRST_SUPERUSER: EmailStr
     FIRST_SUPERUSER_PASSWORD: str
@@ -1,10 +1,70 @@
-from sqlmodel import Session, create_engine, select
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import Session, SQLModel, create_engine, select
 
 from app import crud
 from app.core.config import settings
+from app.core.dialect import IS_POSTGRES, async_url, configure_engine
+from app.core.pool import engine_options, register_pool_gauges
+from app.core.replicas import Replica, ReplicaSet
 from app.models import User, UserCreate
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+engine = create_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI), **engine_options(name="sync")
+)
+# The async engine is used by the async route handlers
+async_engine = create_async_engine(
+    async_url(str(settings.SQLALCHEMY_DATABASE_URI)),
+    **engine_options(name="async", is_async=True),
+)
+configure_engine(engine)
+configure_engine(async_engine.sync_engine)
+register_pool_gauges("sync", engine)
+register_pool_gauges("async", async_engine.sync_engine)
+# Same pool, for sessions that only read: in autocommit there is no BEGIN and
+# ROLLBACK round trip around the queries
+async_read_engine = async_engine.execution_options(isolation_level="AUTOCOMMIT")
+
+
+def create_replica_engine(uri: str, name: str) -> AsyncEngine:
+    options = engine_options(name=name, is_async=True)
+    options["connect_args"] = {
+        **options["connect_args"],
+        "connect_timeout": settings.REPLICA_CONNECT_TIMEOUT_SECONDS,
+    }
+    return create_async_engine(uri, isolation_level="AUTOCOMMIT", **options)
+
+
+replicas = ReplicaSet(
+    [
+        Replica(f"replica{i}", create_replica_engine(str(uri), f"replica{i}"))
+        for i, uri in enumerate(settings.SQLALCHEMY_REPLICA_DATABASE_URIS)
+        if IS_POSTGRES
+    ],
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.REPLICA_CHECK_INTERVAL_SECONDS,
+    check_timeout=settings.REPLICA_CONNECT_TIMEOUT_SECONDS,
+)
+for replica in replicas.replicas:
+    register_pool_gauges(replica.name, replica.engine.sync_engine)
+
+
+# Row level versions of the item count triggers of the migrations
+SQLITE_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS item_count_insert AFTER INSERT ON item
+    BEGIN
+        INSERT INTO itemcount (owner_id, count) VALUES (NEW.owner_id, 1)
+        ON CONFLICT (owner_id) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_count_delete AFTER DELETE ON item
+    BEGIN
+        UPDATE itemcount SET count = count - 1 WHERE owner_id = OLD.owner_id;
+    END
+    """,
+)
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -21,6 +81,14 @@ def init_db(session: Session) -> None:
     # This works because the models are already imported and registered from app.models
     # SQLModel.metadata.create_all(engine)
 
+    # The migrations are written for Postgres, other databases (SQLite for
+    # local runs and tests) get the tables straight from the models
+    if not IS_POSTGRES:
+        SQLModel.metadata.create_all(session.connection())
+        for trigger in SQLITE_TRIGGERS:
+            session.execute(text(trigger))
+        session.commit()
+
     user = session.exec(
         select(User).where(User.email == settings.FIRST_SUPERUSER)
     ).first()
@@ -0,0 +1,58 @@
+"""
+Capabilities of the configured database. Postgres is the production database,
+SQLite is supported for local runs, tests and benchmarks, Postgres only
+features check IS_POSTGRES and are skipped elsewhere.
+"""
+
+from typing import Any
+
+from sqlalchemy import event, make_url
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.core.config import settings
+
+backend = make_url(str(settings.SQLALCHEMY_DATABASE_URI)).get_backend_name()
+IS_POSTGRES = backend == "postgresql"
+IS_SQLITE = backend == "sqlite"
+
+SQLITE_PRAGMAS = (
+    # Readers don't block the writer and the other way around
+    "PRAGMA journal_mode=WAL",
+    # Durable in WAL mode except for the last transactions on power loss
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    # Wait for the write lock instead of failing right away
+    "PRAGMA busy_timeout=5000",
+    # 64 MiB of page cache
+    "PRAGMA cache_size=-65536",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+def async_url(url: str) -> str:
+    """URL for the async engine, psycopg 3 serves both, SQLite needs aiosqlite."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+        return parsed.render_as_string(hide_password=False)
+    return url
+
+
+def insert(table: Any) -> Any:
+    """INSERT supporting ON CONFLICT and RETURNING on the configured database."""
+    if IS_SQLITE:
+        return sqlite.insert(table)
+    return postgresql.insert(table)
+
+
+def _set_sqlite_pragmas(dbapi_connection: Any, _: Any) -> None:
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def configure_engine(engine: Any) -> None:
+    """Per connection setup of a (sync) engine for the configured database."""
+    if IS_SQLITE:
+        event.listen(engine, "connect", _set_sqlite_pragmas)
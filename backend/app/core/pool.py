@@ -0,0 +1,102 @@
+import time
+from typing import Any
+
+from sqlalchemy import Engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    ConnectionPoolEntry,
+    NullPool,
+    Pool,
+    QueuePool,
+)
+
+from app.core.config import settings
+from app.core.dialect import IS_SQLITE
+from app.core.metrics import metrics
+
+
+class _InstrumentedPool(Pool):
+    """Records how long checkouts wait for a connection and how many time out."""
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        name = self.logging_name or "default"
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            metrics.incr(f"db.pool.{name}.timeouts")
+            raise
+        finally:
+            metrics.observe(f"db.pool.{name}.wait", time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def connect_args() -> dict[str, Any]:
+    """
+    psycopg connection arguments. Statements run prepare_threshold times on a
+    connection are prepared server side, None never prepares them.
+    """
+    if IS_SQLITE:
+        # Connections are used by the threadpool, not only the thread that
+        # opened them
+        return {"check_same_thread": False}
+    if settings.DB_PGBOUNCER_TRANSACTION_POOLING:
+        # Each transaction may run on another server connection, where the
+        # statements prepared on the previous one don't exist
+        return {"prepare_threshold": None}
+    return {
+        "prepare_threshold": settings.DB_PREPARE_THRESHOLD,
+        "options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}",
+    }
+
+
+def engine_options(*, name: str, is_async: bool = False) -> dict[str, Any]:
+    """Keyword arguments for create_engine() built from the DB_* settings."""
+    options: dict[str, Any] = {
+        "connect_args": connect_args(),
+        "pool_logging_name": name,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_POOL_CLASS == "null":
+        return {**options, "poolclass": NullPool}
+    return {
+        **options,
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+
+
+def pool_status(engine: Engine) -> dict[str, Any]:
+    pool = engine.pool
+    name = pool.logging_name or "default"
+    status: dict[str, Any] = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+        )
+    snapshot = metrics.snapshot()
+    status["timeouts"] = snapshot["counters"].get(f"db.pool.{name}.timeouts", 0)
+    status["wait"] = snapshot["timings"].get(f"db.pool.{name}.wait")
+    return status
+
+
+def register_pool_gauges(name: str, engine: Engine) -> None:
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        metrics.register_gauge(f"db.pool.{name}.checked_out", pool.checkedout)
+        metrics.register_gauge(f"db.pool.{name}.overflow", pool.overflow)
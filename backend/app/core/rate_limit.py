@@ -0,0 +1,130 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Protocol
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+KEY_PREFIX = "rate-limit:"
+
+# Drops the timestamps older than the window, then records the hit unless the
+# limit is reached, in which case the seconds until the next allowed hit are
+# returned
+_REDIS_SLIDING_WINDOW = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return tostring(tonumber(oldest[2]) + window - now)
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+return false
+"""
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class RateLimitBackend(Protocol):
+    def hit(self, key: str, limit: int, window: float) -> float | None:
+        """
+        Record a hit for the key and return None if it is within the limit,
+        otherwise the seconds to wait before the next hit is allowed.
+        """
+        ...
+
+    def reset(self) -> None: ...
+
+
+class MemoryRateLimitBackend:
+    """
+    Sliding window kept in the memory of the current worker process.
+
+    At most max_keys keys are tracked, the least recently hit ones are dropped
+    first, so memory stays bounded when many distinct keys are hit at once.
+    """
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._hits: OrderedDict[str, deque[float]] = OrderedDict()
+
+    def hit(self, key: str, limit: int, window: float) -> float | None:
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque()
+                if len(self._hits) > self.max_keys:
+                    self._hits.popitem(last=False)
+            else:
+                self._hits.move_to_end(key)
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) >= limit:
+                return hits[0] + window - now
+            hits.append(now)
+            return None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hits.clear()
+
+
+class RedisRateLimitBackend:
+    """Sliding window in Redis, shared by every worker using the same server."""
+
+    def __init__(self, url: str) -> None:
+        try:
+            import redis
+        except ImportError as e:  # pragma: no cover
+            raise RuntimeError(
+                "RATE_LIMIT_STORAGE_URL points to Redis, install the 'redis' extra"
+            ) from e
+        self._client: Any = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_SLIDING_WINDOW)
+
+    def hit(self, key: str, limit: int, window: float) -> float | None:
+        retry_after = self._script(
+            keys=[KEY_PREFIX + key],
+            args=[time.time(), window, limit, uuid.uuid4().hex],
+        )
+        return float(retry_after) if retry_after is not None else None
+
+    def reset(self) -> None:
+        for key in self._client.scan_iter(match=f"{KEY_PREFIX}*"):
+            self._client.delete(key)
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend) -> None:
+        self.backend = backend
+
+    def check(self, key: str, *, limit: int, window: float) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        retry_after = self.backend.hit(key, limit, window)
+        if retry_after is not None:
+            metrics.incr("rate_limit.rejected")
+            raise RateLimitExceeded(retry_after)
+
+    def reset(self) -> None:
+        self.backend.reset()
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    url = settings.RATE_LIMIT_STORAGE_URL
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRateLimitBackend(url)
+    return MemoryRateLimitBackend()
+
+
+rate_limiter = RateLimiter(get_rate_limit_backend())
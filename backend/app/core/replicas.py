@@ -0,0 +1,92 @@
+import asyncio
+import random
+from collections.abc import Sequence
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.metrics import metrics
+
+# Seconds the replica is behind the primary, 0 when it has replayed everything
+# it received (an idle primary doesn't make a replica lag)
+_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+    """
+)
+
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine) -> None:
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.lag = 0.0
+
+
+class ReplicaSet:
+    """
+    Read replicas, checked for availability and replication lag every
+    check_interval seconds by a background task. Reads fall back to the primary
+    when none is usable.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[Replica],
+        *,
+        max_lag: float,
+        check_interval: float,
+        check_timeout: float,
+    ) -> None:
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+
+    async def check(self) -> None:
+        """Check every replica at once, each for at most check_timeout seconds."""
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    async def run(self) -> None:
+        """Check the replicas every check_interval seconds, until cancelled."""
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    async def _check(self, replica: Replica) -> None:
+        try:
+            lag = await asyncio.wait_for(self._lag(replica), self.check_timeout)
+        except (DBAPIError, asyncio.TimeoutError):
+            self.mark_failed(replica)
+            return
+        replica.lag = lag
+        replica.healthy = replica.lag <= self.max_lag
+        metrics.set_gauge(f"db.replica.{replica.name}.lag", replica.lag)
+
+    async def _lag(self, replica: Replica) -> float:
+        async with replica.engine.connect() as conn:
+            return float((await conn.execute(_LAG_QUERY)).scalar_one())
+
+    def choose(self) -> Replica | None:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            if self.replicas:
+                metrics.incr("db.replica.fallbacks")
+            return None
+        return random.choice(healthy)
+
+    def mark_failed(self, replica: Replica) -> None:
+        replica.healthy = False
+        metrics.incr(f"db.replica.{replica.name}.failures")
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
@@ -0,0 +1,78 @@
+import threading
+import time
+import uuid
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlmodel import Session, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models import TokenEpoch
+
+# Rows are re-read for this long after their timestamp, so epochs bumped by
+# transactions that committed out of order are not missed
+OVERLAP = timedelta(seconds=30)
+
+
+class TokenEpochTable:
+    """
+    In-memory copy of the token epochs, refreshed incrementally from the
+    tokenepoch table so checking a token doesn't need a query.
+    """
+
+    def __init__(self, refresh_interval: float) -> None:
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._epochs: dict[uuid.UUID, int] = {}
+        self._since: datetime | None = None
+        self._refreshed_at = float("-inf")
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._refreshed_at >= self.refresh_interval
+
+    def refresh(self, session: Session) -> None:
+        self._apply(session.exec(self._statement()).all())
+
+    async def refresh_async(self, session: AsyncSession) -> None:
+        self._apply((await session.exec(self._statement())).all())
+
+    def _statement(self) -> Any:
+        statement = select(TokenEpoch)
+        if self._since is not None:
+            statement = statement.where(
+                col(TokenEpoch.updated_at) > self._since - OVERLAP
+            )
+        return statement
+
+    def _apply(self, rows: Sequence[TokenEpoch]) -> None:
+        with self._lock:
+            for row in rows:
+                self._set(row.user_id, row.epoch)
+                if self._since is None or row.updated_at > self._since:
+                    self._since = row.updated_at
+            self._refreshed_at = time.monotonic()
+        metrics.incr("auth.token_epochs.refreshes")
+
+    def get(self, user_id: uuid.UUID) -> int:
+        return self._epochs.get(user_id, 0)
+
+    def set(self, user_id: uuid.UUID, epoch: int) -> None:
+        with self._lock:
+            self._set(user_id, epoch)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epochs.clear()
+            self._since = None
+            self._refreshed_at = float("-inf")
+
+    def _set(self, user_id: uuid.UUID, epoch: int) -> None:
+        # Epochs only move forward, re-reading an older row is harmless
+        if epoch > self._epochs.get(user_id, 0):
+            self._epochs[user_id] = epoch
+
+
+token_epochs = TokenEpochTable(refresh_interval=settings.TOKEN_EPOCH_REFRESH_SECONDS)
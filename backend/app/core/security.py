@@ -1,27 +1,237 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, TypeVar
 
+import anyio
 import jwt
 from passlib.context import CryptContext
+from passlib.exc import UnknownHashError
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.models import TokenPayload
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+SCHEMES = ("bcrypt", "argon2")
+
+
+def build_crypt_context(
+    *,
+    scheme: str,
+    bcrypt_rounds: int,
+    argon2_memory_cost: int,
+    argon2_time_cost: int,
+    argon2_parallelism: int,
+) -> CryptContext:
+    # Both schemes are always accepted so existing hashes keep working after a
+    # switch (either way), hashes in a non default scheme or with other costs
+    # are marked deprecated
+    schemes = [scheme, *(other for other in SCHEMES if other != scheme)]
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__rounds=argon2_time_cost,
+        argon2__min_rounds=argon2_time_cost,
+        argon2__max_rounds=argon2_time_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+pwd_context = build_crypt_context(
+    scheme=settings.PASSWORD_HASH_SCHEME,
+    bcrypt_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    argon2_memory_cost=settings.PASSWORD_ARGON2_MEMORY_COST,
+    argon2_time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+    argon2_parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+)
 
 
 ALGORITHM = "HS256"
 
+T = TypeVar("T")
+
+# Access tokens mapped to their payload and a snapshot of the user they were
+# resolved to
+user_cache: TTLCache[str, tuple[TokenPayload, dict[str, Any]]] = TTLCache(
+    maxsize=settings.AUTH_CACHE_MAX_SIZE
+)
+
+_hash_pool: ProcessPoolExecutor | None = None
+_hash_pool_lock = threading.Lock()
+
+
+def create_access_token(
+    subject: str | Any,
+    expires_delta: timedelta,
+    *,
+    epoch: int = 0,
+    is_active: bool = True,
+    is_superuser: bool = False,
+) -> str:
+    expire = datetime.now(timezone.utc) + expires_delta
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "type": "access",
+        "epoch": epoch,
+        "act": is_active,
+        "su": is_superuser,
+    }
+    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
 
-def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
+def create_refresh_token(
+    subject: str | Any, expires_delta: timedelta, *, epoch: int = 0
+) -> str:
     expire = datetime.now(timezone.utc) + expires_delta
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {"exp": expire, "sub": str(subject), "type": "refresh", "epoch": epoch}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def decode_token(token: str, token_type: str = "access") -> TokenPayload:
+    """
+    Decode and validate a JWT, raises InvalidTokenError or ValidationError.
+    """
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    token_data = TokenPayload(**payload)
+    if token_data.type != token_type:
+        raise jwt.InvalidTokenError(f"Expected a {token_type} token")
+    return token_data
+
+
+def invalidate_user_cache(user_id: uuid.UUID) -> None:
+    user_cache.invalidate_tag(user_id)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return pwd_context.verify(plain_password, hashed_password)
+    except UnknownHashError:
+        return False
+
+
+def _verify_and_update(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    # A hash in a scheme that isn't configured can't match, fail like a wrong
+    # password instead of erroring
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except UnknownHashError:
+        return False, None
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def get_password_hash_pool() -> ProcessPoolExecutor | None:
+    """
+    Return the process pool used for password hashing, or None to hash inline.
+
+    The pool is created lazily so that importing this module in the hashing
+    workers themselves doesn't spawn more processes.
+    """
+    global _hash_pool
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return None
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _hash_pool
+
+
+def shutdown_password_hash_pool() -> None:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=True, cancel_futures=True)
+            _hash_pool = None
+
+
+def _submit(pool: ProcessPoolExecutor, fn: Callable[..., T], *args: Any) -> "Future[T]":
+    start = time.perf_counter()
+    metrics.add_gauge("password_hash.queue_depth", 1)
+
+    def _done(_: "Future[T]") -> None:
+        metrics.add_gauge("password_hash.queue_depth", -1)
+        metrics.observe("password_hash.latency", time.perf_counter() - start)
+
+    future = pool.submit(fn, *args)
+    future.add_done_callback(_done)
+    return future
+
+
+def _run(fn: Callable[..., T], *args: Any) -> T:
+    pool = get_password_hash_pool()
+    if pool is None:
+        with metrics.timer("password_hash.latency"):
+            return fn(*args)
+    return _submit(pool, fn, *args).result()
+
+
+async def _run_async(fn: Callable[..., T], *args: Any) -> T:
+    pool = get_password_hash_pool()
+    if pool is None:
+        return await anyio.to_thread.run_sync(_run, fn, *args)
+    return await asyncio.wrap_future(_submit(pool, fn, *args))
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _run(_verify, plain_password, hashed_password)
+
+
+def get_password_hashes(passwords: Sequence[str]) -> list[str]:
+    """
+    Hash many passwords in parallel, in the process pool when configured or
+    else in threads (bcrypt and argon2 release the GIL while hashing).
+    """
+    pool = get_password_hash_pool()
+    if pool is not None:
+        futures = [_submit(pool, _hash, password) for password in passwords]
+        return [future.result() for future in futures]
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return list(executor.map(_run, [_hash] * len(passwords), passwords))
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Verify the password and return a new hash if the stored one is outdated.
+    """
+    return _run(_verify_and_update, plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _run(_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_async(_verify, plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    return await _run_async(_verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_async(_hash, password)
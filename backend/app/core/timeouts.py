@@ -0,0 +1,89 @@
+import asyncio
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Any
+
+import anyio
+from sqlalchemy import event
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.types import Receive
+
+from app.core.config import settings
+from app.core.dialect import IS_POSTGRES
+from app.core.metrics import metrics
+
+
+def connection_default_timeout() -> int | None:
+    """
+    statement_timeout new connections start with, None when it's left to the
+    server (PgBouncer doesn't pass startup options through).
+    """
+    if settings.DB_PGBOUNCER_TRANSACTION_POOLING:
+        return None
+    return settings.DB_STATEMENT_TIMEOUT_MS
+
+
+def apply_statement_timeout(
+    session: AsyncSession, timeout_ms: int, *, autocommit: bool
+) -> None:
+    """
+    Run the statements of the session with a statement_timeout of timeout_ms,
+    0 disables it. Nothing is sent when the connection already has it.
+
+    Autocommit sessions set it for the whole connection and record it in
+    connection.info, the pool is shared with the transactional sessions.
+    """
+    if not IS_POSTGRES:
+        return
+    default = connection_default_timeout()
+
+    def after_begin(_: Any, __: Any, connection: Any) -> None:
+        current = connection.info.get("statement_timeout", default)
+        if not autocommit:
+            # Reverted by the end of the transaction
+            if timeout_ms != current:
+                connection.exec_driver_sql(
+                    f"SET LOCAL statement_timeout = {timeout_ms}"
+                )
+            return
+        if default is None:
+            # The server connection is shared with other clients
+            return
+        if current != timeout_ms:
+            connection.exec_driver_sql(f"SET statement_timeout = {timeout_ms}")
+            connection.info["statement_timeout"] = timeout_ms
+
+    event.listen(session.sync_session, "after_begin", after_begin)
+
+
+@asynccontextmanager
+async def cancel_on_disconnect(
+    receive: Receive, session: AsyncSession
+) -> AsyncGenerator[None, None]:
+    """
+    Cancel the query running on the session's connection if the client
+    disconnects, so it doesn't keep the connection busy for nobody.
+
+    Only for requests without a body to read, the disconnect is awaited on the
+    request's receive channel.
+    """
+    driver_connection = None
+    if IS_POSTGRES:
+        connection = await session.connection()
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+    if driver_connection is None:
+        yield
+        return
+
+    async def watch() -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        metrics.incr("db.cancelled_on_disconnect")
+        # Sends the cancel request over a new connection, blocking
+        await anyio.to_thread.run_sync(driver_connection.cancel)
+
+    task = asyncio.create_task(watch())
+    try:
+        yield
+    finally:
+        task.cancel()
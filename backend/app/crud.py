@@ -1,10 +1,36 @@
+import time
 import uuid
+from collections.abc import Callable, Sequence
 from typing import Any
 
-from sqlmodel import Session, select
+import psycopg
+from sqlalchemy import text, update
+from sqlmodel import Session, col, delete, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
 
-from app.core.security import get_password_hash, verify_password
-from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
+from app.core.dialect import IS_POSTGRES, insert
+from app.core.ids import uuid7
+from app.core.revocation import token_epochs
+from app.core.security import (
+    get_password_hash,
+    get_password_hash_async,
+    get_password_hashes,
+    invalidate_user_cache,
+    verify_and_update_password,
+    verify_and_update_password_async,
+)
+from app.models import (
+    Item,
+    ItemCount,
+    ItemCreate,
+    ItemsFilter,
+    ItemUpdate,
+    TokenEpoch,
+    User,
+    UserCreate,
+    UserUpdate,
+)
 
 
 def create_user(*, session: Session, user_create: UserCreate) -> User:
@@ -13,12 +39,87 @@ def create_user(*, session: Session, user_create: UserCreate) -> User:
     )
     session.add(db_obj)
     session.commit()
-    session.refresh(db_obj)
     return db_obj
 
 
+# Conflicts on ix_user_email_lower, emails are unique regardless of case
+EMAIL_CONFLICT_TARGET = [func.lower(col(User.email))]
+
+
+async def create_user_async(
+    *, session: AsyncSession, user_create: UserCreate
+) -> User | None:
+    """
+    Create the user in a single INSERT ... ON CONFLICT DO NOTHING RETURNING,
+    returns None if the email is already taken.
+    """
+    hashed_password = await get_password_hash_async(user_create.password)
+    row = User.model_validate(
+        user_create, update={"hashed_password": hashed_password}
+    ).model_dump()
+    statement = (
+        insert(User)
+        .values(**row)
+        .on_conflict_do_nothing(index_elements=EMAIL_CONFLICT_TARGET)
+        .returning(User)
+    )
+    result = await session.exec(statement)
+    db_obj: User | None = result.scalar_one_or_none()
+    await session.commit()
+    return db_obj
+
+
+def create_users_bulk(
+    *, session: Session, users_create: Sequence[UserCreate], batch_size: int = 1000
+) -> list[uuid.UUID | None]:
+    """
+    Create many users, returns the new id for each row, or None when the email
+    is already taken (in the DB or by a previous row).
+    """
+    emails = [user_create.email.lower() for user_create in users_create]
+    statement = select(func.lower(User.email)).where(func.lower(User.email).in_(emails))
+    taken = set(session.exec(statement).all())
+    pending: list[int] = []
+    for i, email in enumerate(emails):
+        if email not in taken:
+            taken.add(email)
+            pending.append(i)
+
+    hashed_passwords = get_password_hashes([users_create[i].password for i in pending])
+    ids: list[uuid.UUID | None] = [None] * len(users_create)
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start : start + batch_size]
+        rows = [
+            User.model_validate(
+                users_create[i], update={"hashed_password": hashed_passwords[start + n]}
+            ).model_dump()
+            for n, i in enumerate(batch)
+        ]
+        # Concurrent signups may have taken an email since the check above
+        insert_statement = (
+            insert(User)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=EMAIL_CONFLICT_TARGET)
+            .returning(func.lower(User.email), col(User.id))
+        )
+        created = dict(session.exec(insert_statement).all())
+        session.commit()
+        for i in batch:
+            ids[i] = created.get(emails[i])
+    return ids
+
+
+def _revokes_tokens(db_user: User, user_data: dict[str, Any]) -> bool:
+    # Tokens carry these as claims, so they must be reissued when they change
+    return any(
+        key in user_data and user_data[key] != getattr(db_user, key)
+        for key in ("is_active", "is_superuser")
+    )
+
+
 def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
     user_data = user_in.model_dump(exclude_unset=True)
+    revoke_tokens = _revokes_tokens(db_user, user_data)
     extra_data = {}
     if "password" in user_data:
         password = user_data["password"]
@@ -27,22 +128,196 @@ def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
     db_user.sqlmodel_update(user_data, update=extra_data)
     session.add(db_user)
     session.commit()
-    session.refresh(db_user)
+    invalidate_user_cache(db_user.id)
+    if revoke_tokens:
+        revoke_user_tokens(session=session, user_id=db_user.id)
+    return db_user
+
+
+async def update_user_async(
+    *, session: AsyncSession, db_user: User, user_in: UserUpdate
+) -> Any:
+    user_data = user_in.model_dump(exclude_unset=True)
+    revoke_tokens = _revokes_tokens(db_user, user_data)
+    extra_data = {}
+    if "password" in user_data:
+        password = user_data["password"]
+        hashed_password = await get_password_hash_async(password)
+        extra_data["hashed_password"] = hashed_password
+    db_user.sqlmodel_update(user_data, update=extra_data)
+    session.add(db_user)
+    await session.commit()
+    invalidate_user_cache(db_user.id)
+    if revoke_tokens:
+        await revoke_user_tokens_async(session=session, user_id=db_user.id)
     return db_user
 
 
 def get_user_by_email(*, session: Session, email: str) -> User | None:
-    statement = select(User).where(User.email == email)
+    statement = select(User).where(func.lower(User.email) == email.lower())
     session_user = session.exec(statement).first()
     return session_user
 
 
-def authenticate(*, session: Session, email: str, password: str) -> User | None:
+async def get_user_by_email_async(*, session: AsyncSession, email: str) -> User | None:
+    statement = select(User).where(func.lower(User.email) == email.lower())
+    session_user = (await session.exec(statement)).first()
+    return session_user
+
+
+def _password_hash_statement(user_id: uuid.UUID, hashed_password: str) -> Any:
+    return (
+        update(User)
+        .where(col(User.id) == user_id)
+        .values(hashed_password=hashed_password)
+    )
+
+
+def update_password_hash(
+    *, session: Session, user_id: uuid.UUID, hashed_password: str
+) -> None:
+    session.exec(_password_hash_statement(user_id, hashed_password))
+    session.commit()
+    invalidate_user_cache(user_id)
+
+
+async def update_password_hash_async(
+    *, session: AsyncSession, user_id: uuid.UUID, hashed_password: str
+) -> None:
+    await session.exec(_password_hash_statement(user_id, hashed_password))
+    await session.commit()
+    invalidate_user_cache(user_id)
+
+
+def get_token_epoch(*, session: Session, user_id: uuid.UUID) -> int:
+    token_epoch = session.get(TokenEpoch, user_id)
+    return token_epoch.epoch if token_epoch else 0
+
+
+async def get_token_epoch_async(*, session: AsyncSession, user_id: uuid.UUID) -> int:
+    token_epoch = await session.get(TokenEpoch, user_id)
+    return token_epoch.epoch if token_epoch else 0
+
+
+def _revoke_statement(user_id: uuid.UUID) -> Any:
+    return (
+        insert(TokenEpoch)
+        .values(user_id=user_id, epoch=1, updated_at=func.now())
+        .on_conflict_do_update(
+            index_elements=[TokenEpoch.user_id],
+            set_={"epoch": TokenEpoch.epoch + 1, "updated_at": func.now()},
+        )
+        .returning(TokenEpoch.epoch)
+    )
+
+
+def revoke_user_tokens(*, session: Session, user_id: uuid.UUID) -> int:
+    """
+    Revoke every access and refresh token issued to the user so far.
+    """
+    epoch: int = session.exec(_revoke_statement(user_id)).scalar_one()
+    session.commit()
+    token_epochs.set(user_id, epoch)
+    invalidate_user_cache(user_id)
+    return epoch
+
+
+async def revoke_user_tokens_async(*, session: AsyncSession, user_id: uuid.UUID) -> int:
+    epoch: int = (await session.exec(_revoke_statement(user_id))).scalar_one()
+    await session.commit()
+    token_epochs.set(user_id, epoch)
+    invalidate_user_cache(user_id)
+    return epoch
+
+
+async def has_more_items_than_async(
+    *, session: AsyncSession, owner_id: uuid.UUID, limit: int
+) -> bool:
+    """
+    Whether the user owns more than limit items, without counting all of them.
+    """
+    statement = select(Item.id).where(Item.owner_id == owner_id).offset(limit).limit(1)
+    return (await session.exec(statement)).first() is not None
+
+
+def purge_user(
+    *, session: Session, user_id: uuid.UUID, batch_size: int, pause: float = 0
+) -> int:
+    """
+    Delete the items of the user in batches, each in its own short transaction,
+    then the user itself. Returns the number of items deleted.
+    """
+    purged = 0
+    while True:
+        batch = select(Item.id).where(Item.owner_id == user_id).limit(batch_size)
+        statement = delete(Item).where(col(Item.id).in_(batch))
+        deleted: int = session.exec(statement).rowcount  # type: ignore
+        session.commit()
+        purged += deleted
+        if deleted < batch_size:
+            break
+        time.sleep(pause)
+    session.exec(delete(User).where(col(User.id) == user_id))  # type: ignore
+    session.commit()
+    return purged
+
+
+def get_users_to_purge(*, session: Session) -> Sequence[uuid.UUID]:
+    statement = select(User.id).where(col(User.deleted_at).is_not(None))
+    return session.exec(statement).all()
+
+
+def authenticate(
+    *,
+    session: Session,
+    email: str,
+    password: str,
+    on_rehash: Callable[[uuid.UUID, str], None] | None = None,
+) -> User | None:
+    """
+    Return the user if the password matches.
+
+    When the stored hash uses an outdated scheme or cost, the new hash is passed
+    to `on_rehash` (e.g. to store it in a background task), or stored right away.
+    """
     db_user = get_user_by_email(session=session, email=email)
     if not db_user:
         return None
-    if not verify_password(password, db_user.hashed_password):
+    verified, new_hash = verify_and_update_password(password, db_user.hashed_password)
+    if not verified:
+        return None
+    if new_hash:
+        if on_rehash:
+            on_rehash(db_user.id, new_hash)
+        else:
+            update_password_hash(
+                session=session, user_id=db_user.id, hashed_password=new_hash
+            )
+    return db_user
+
+
+async def authenticate_async(
+    *,
+    session: AsyncSession,
+    email: str,
+    password: str,
+    on_rehash: Callable[[uuid.UUID, str], None] | None = None,
+) -> User | None:
+    db_user = await get_user_by_email_async(session=session, email=email)
+    if not db_user:
+        return None
+    verified, new_hash = await verify_and_update_password_async(
+        password, db_user.hashed_password
+    )
+    if not verified:
         return None
+    if new_hash:
+        if on_rehash:
+            on_rehash(db_user.id, new_hash)
+        else:
+            await update_password_hash_async(
+                session=session, user_id=db_user.id, hashed_password=new_hash
+            )
     return db_user
 
 
@@ -50,5 +325,212 @@ def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -
     db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
     session.add(db_item)
     session.commit()
-    session.refresh(db_item)
     return db_item
+
+
+ITEM_COPY = "COPY item (id, owner_id, title, description) FROM STDIN"
+
+
+def create_items_bulk(
+    *,
+    session: Session,
+    items_create: Sequence[ItemCreate],
+    owner_id: uuid.UUID,
+    batch_size: int = 5000,
+) -> list[uuid.UUID]:
+    """
+    Create many items in one transaction, in batches of batch_size rows sent
+    with COPY on Postgres or an executemany INSERT elsewhere. Returns the ids.
+    """
+    ids: list[uuid.UUID] = []
+    for start in range(0, len(items_create), batch_size):
+        rows = [
+            {"id": uuid7(), "owner_id": owner_id, **item_create.model_dump()}
+            for item_create in items_create[start : start + batch_size]
+        ]
+        if IS_POSTGRES:
+            # COPY isn't part of the DB-API, it needs the psycopg connection
+            driver_connection = session.connection().connection.driver_connection
+            assert isinstance(driver_connection, psycopg.Connection)
+            with driver_connection.cursor() as cursor, cursor.copy(ITEM_COPY) as copy:
+                for row in rows:
+                    copy.write_row(
+                        (row["id"], owner_id, row["title"], row["description"])
+                    )
+        else:
+            session.execute(insert(Item), rows)
+        ids.extend(row["id"] for row in rows)
+    session.commit()
+    return ids
+
+
+def item_count_statement(owner_id: uuid.UUID | None) -> Any:
+    """
+    Number of items of owner_id, or of everyone when None, read from the
+    maintained counters instead of counting the items.
+    """
+    statement: SelectOfScalar[int] = select(func.coalesce(func.sum(ItemCount.count), 0))
+    if owner_id is not None:
+        statement = statement.where(ItemCount.owner_id == owner_id)
+    return statement
+
+
+# Row count of the table from the planner statistics (kept by autovacuum and
+# ANALYZE), summed over the partitions of a partitioned table
+_ESTIMATE_QUERY = text(
+    """
+    SELECT coalesce(sum(greatest(c.reltuples, 0)), 0)::bigint
+    FROM pg_class AS c
+    WHERE c.oid IN (
+        SELECT inhrelid FROM pg_inherits
+        WHERE inhparent = CAST(quote_ident(:table) AS regclass)
+    )
+    OR (c.oid = CAST(quote_ident(:table) AS regclass) AND c.relkind <> 'p')
+    """
+)
+
+
+async def estimate_rows_async(*, session: AsyncSession, table: str) -> int:
+    """
+    Approximate number of rows of the table, Postgres only.
+    """
+    result = await session.execute(_ESTIMATE_QUERY, {"table": table})
+    estimate: int = result.scalar_one()
+    return estimate
+
+
+def _item_filter(item_id: uuid.UUID, owner_id: uuid.UUID | None) -> list[Any]:
+    # Items of any owner when owner_id is None
+    criteria = [col(Item.id) == item_id]
+    if owner_id is not None:
+        criteria.append(col(Item.owner_id) == owner_id)
+    return criteria
+
+
+async def update_item_async(
+    *,
+    session: AsyncSession,
+    item_id: uuid.UUID,
+    owner_id: uuid.UUID | None,
+    item_in: ItemUpdate,
+) -> Item | None:
+    """
+    Update the item in a single UPDATE ... RETURNING statement, only if it
+    belongs to owner_id (unless None). Returns None when nothing matched.
+    """
+    criteria = _item_filter(item_id, owner_id)
+    update_dict = item_in.model_dump(exclude_unset=True)
+    if not update_dict:
+        return (await session.exec(select(Item).where(*criteria))).first()
+    statement = update(Item).where(*criteria).values(**update_dict).returning(Item)
+    result = await session.exec(statement)  # type: ignore
+    item: Item | None = result.scalar_one_or_none()
+    await session.commit()
+    return item
+
+
+async def delete_item_async(
+    *, session: AsyncSession, item_id: uuid.UUID, owner_id: uuid.UUID | None
+) -> bool:
+    """
+    Delete the item in a single statement, only if it belongs to owner_id
+    (unless None). Returns whether it was deleted.
+    """
+    statement = (
+        delete(Item).where(*_item_filter(item_id, owner_id)).returning(col(Item.id))
+    )
+    deleted = (await session.exec(statement)).first()  # type: ignore
+    await session.commit()
+    return deleted is not None
+
+
+async def _write_items_async(
+    session: AsyncSession,
+    write: Callable[[list[Any]], Any],
+    *,
+    owner_id: uuid.UUID | None,
+    items_filter: ItemsFilter,
+    batch_size: int,
+    max_rows: int,
+) -> tuple[list[uuid.UUID], bool]:
+    """
+    Run write (an UPDATE or DELETE of the items matching the criteria, returning
+    their ids) over the filtered items in statements of batch_size items, in a
+    single transaction. Returns the ids written and whether more items matched
+    than max_rows.
+    """
+    criteria = []
+    if owner_id is not None:
+        criteria.append(col(Item.owner_id) == owner_id)
+    if (prefix := items_filter.title_prefix) is not None:
+        # Not LIKE, which ignores the case on SQLite
+        criteria.append(func.substr(col(Item.title), 1, len(prefix)) == prefix)
+    written: list[uuid.UUID] = []
+    has_more = False
+    if items_filter.ids is not None:
+        ids = items_filter.ids
+        for start in range(0, len(ids), batch_size):
+            in_chunk = col(Item.id).in_(ids[start : start + batch_size])
+            written += (await session.exec(write([*criteria, in_chunk]))).scalars()
+    else:
+        # Walk the matching items in id order, a chunk at a time
+        matching = select(Item.id).where(*criteria).order_by(col(Item.id))
+        while True:
+            limit = min(batch_size, max_rows - len(written))
+            chunk = matching.limit(limit)
+            if written:
+                chunk = chunk.where(col(Item.id) > max(written))
+            result = await session.exec(write([col(Item.id).in_(chunk)]))
+            ids = list(result.scalars())
+            written += ids
+            if len(ids) < limit:
+                break
+            if len(written) == max_rows:
+                remaining = matching.where(col(Item.id) > max(written)).limit(1)
+                has_more = (await session.exec(remaining)).first() is not None
+                break
+    await session.commit()
+    return written, has_more
+
+
+async def update_items_async(
+    *,
+    session: AsyncSession,
+    owner_id: uuid.UUID | None,
+    items_filter: ItemsFilter,
+    values: dict[str, Any],
+    batch_size: int,
+    max_rows: int,
+) -> tuple[list[uuid.UUID], bool]:
+    def write(criteria: list[Any]) -> Any:
+        return update(Item).where(*criteria).values(**values).returning(col(Item.id))
+
+    return await _write_items_async(
+        session,
+        write,
+        owner_id=owner_id,
+        items_filter=items_filter,
+        batch_size=batch_size,
+        max_rows=max_rows,
+    )
+
+
+async def delete_items_async(
+    *,
+    session: AsyncSession,
+    owner_id: uuid.UUID | None,
+    items_filter: ItemsFilter,
+    batch_size: int,
+    max_rows: int,
+) -> tuple[list[uuid.UUID], bool]:
+    def write(criteria: list[Any]) -> Any:
+        return delete(Item).where(*criteria).returning(col(Item.id))
+
+    return await _write_items_async(
+        session,
+        write,
+        owner_id=owner_id,
+        items_filter=items_filter,
+        batch_size=batch_size,
+        max_rows=max_rows,
+    )
@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+import uuid
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.bulk import BulkFormat
+from app.core.config import settings
+from app.core.db import async_engine
+from app.core.timeouts import apply_statement_timeout
+from app.models import Item
+
+EXPORT_COLUMNS = ("id", "owner_id", "title", "description")
+EXPORT_MEDIA_TYPES: dict[BulkFormat, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def encode_rows(rows: Sequence[Any], format: BulkFormat) -> str:
+    if format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, row, strict=True)), default=str) + "\n"
+        for row in rows
+    )
+
+
+async def export_items(
+    *, owner_id: uuid.UUID | None, format: BulkFormat, batch_size: int
+) -> AsyncIterator[str]:
+    """
+    Encoded items of owner_id (every item when None) in id order, read from a
+    server side cursor batch_size rows at a time so memory use doesn't grow
+    with the number of items.
+
+    It has its own session on the primary, it runs after the request handler
+    returned and server side cursors need a transaction (replica and read
+    sessions are in autocommit).
+    """
+    statement = select(*(getattr(Item, name) for name in EXPORT_COLUMNS))
+    if owner_id is not None:
+        statement = statement.where(Item.owner_id == owner_id)
+    statement = statement.order_by(col(Item.id)).execution_options(yield_per=batch_size)
+    if format == "csv":
+        yield encode_rows([EXPORT_COLUMNS], format)
+    async with AsyncSession(async_engine) as session:
+        apply_statement_timeout(
+            session, settings.DB_STATEMENT_TIMEOUT_MS, autocommit=False
+        )
+        result = await session.stream(statement)
+        async for rows in result.partitions():
+            yield encode_rows(rows, format)
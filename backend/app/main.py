@@ -1,16 +1,41 @@
+import asyncio
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
 import sentry_sdk
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
+from psycopg.errors import QueryCanceled
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.api.middleware import ReadYourWritesMiddleware
 from app.core.config import settings
+from app.core.db import async_engine, replicas
+from app.core.metrics import metrics
+from app.core.security import shutdown_password_hash_pool
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncGenerator[None, None]:
+    # Replicas are checked in the background, never while serving a request
+    check_replicas = asyncio.create_task(replicas.run()) if replicas.replicas else None
+    yield
+    if check_replicas is not None:
+        check_replicas.cancel()
+    shutdown_password_hash_pool()
+    # Pooled async connections are bound to the event loop that is closing
+    await async_engine.dispose()
+    await replicas.dispose()
+
+
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
@@ -18,6 +43,7 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -30,4 +56,29 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+if replicas.replicas and settings.READ_YOUR_WRITES_SECONDS > 0:
+    app.add_middleware(
+        ReadYourWritesMiddleware, window=settings.READ_YOUR_WRITES_SECONDS
+    )
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(_: Request, __: PoolTimeoutError) -> JSONResponse:
+    return JSONResponse(
+        status_code=503, content={"detail": "Database is busy, try again later"}
+    )
+
+
+@app.exception_handler(OperationalError)
+async def operational_error_handler(_: Request, exc: OperationalError) -> JSONResponse:
+    if isinstance(exc.orig, QueryCanceled):
+        # statement_timeout, or cancelled because the client disconnected
+        metrics.incr("db.statement_timeouts")
+        return JSONResponse(status_code=504, content={"detail": "Query timed out"})
+    metrics.incr("db.unavailable")
+    return JSONResponse(
+        status_code=503, content={"detail": "Database is unavailable, try again later"}
+    )
+
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -1,12 +1,17 @@
 import uuid
+from datetime import datetime, timezone
 
 from pydantic import EmailStr
-from sqlmodel import Field, Relationship, SQLModel
+from sqlalchemy import Index, func
+from sqlmodel import Field, Relationship, SQLModel, col
+
+from app.core.ids import uuid7
 
 
 # Shared properties
 class UserBase(SQLModel):
-    email: EmailStr = Field(unique=True, index=True, max_length=255)
+    # Unique regardless of case, see ix_user_email_lower
+    email: EmailStr = Field(max_length=255)
     is_active: bool = True
     is_superuser: bool = False
     full_name: str | None = Field(default=None, max_length=255)
@@ -41,9 +46,18 @@ class UpdatePassword(SQLModel):
 
 # Database model, database table inferred from class name
 class User(UserBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
     hashed_password: str
-    items: list["Item"] = Relationship(back_populates="owner", cascade_delete=True)
+    # Set when the user is being purged in the background
+    deleted_at: datetime | None = None
+    # The items are deleted by the database (ON DELETE CASCADE), never loaded
+    items: list["Item"] = Relationship(
+        back_populates="owner", cascade_delete=True, passive_deletes=True
+    )
+
+
+# Emails are stored as given, lookups and uniqueness ignore the case
+email_lower_index = Index("ix_user_email_lower", func.lower(User.email), unique=True)
 
 
 # Properties to return via API, id is always required
@@ -53,7 +67,27 @@ class UserPublic(UserBase):
 
 class UsersPublic(SQLModel):
     data: list[UserPublic]
-    count: int
+    # None with ?count=none
+    count: int | None
+    # Pass as ?cursor= to get the next page, None on the last one
+    next_cursor: str | None = None
+
+
+# Outcome of one row of a bulk user creation
+class UserBulkResult(SQLModel):
+    row: int
+    status: str
+    email: str | None = None
+    id: uuid.UUID | None = None
+    error: str | None = None
+
+
+class UsersBulkPublic(SQLModel):
+    data: list[UserBulkResult]
+    created: int
+    failed: int
+    elapsed_seconds: float
+    rows_per_second: float
 
 
 # Shared properties
@@ -73,14 +107,34 @@ class ItemUpdate(ItemBase):
 
 
 # Database model, database table inferred from class name
+# On Postgres the table is hash partitioned by owner_id, so its primary key is
+# (id, owner_id) there, ids are still unique on their own
 class Item(ItemBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
     owner_id: uuid.UUID = Field(
         foreign_key="user.id", nullable=False, ondelete="CASCADE"
     )
     owner: User | None = Relationship(back_populates="items")
 
 
+# Owner listings in id order (the keyset pagination order) read only the index
+owner_items_index = Index(
+    "ix_item_owner_id_id",
+    col(Item.owner_id),
+    col(Item.id),
+    postgresql_include=["title", "description"],
+)
+
+
+# Number of items of each user, kept up to date by triggers on item (created
+# by the migrations, or init_db elsewhere) so listings don't count the rows
+class ItemCount(SQLModel, table=True):
+    owner_id: uuid.UUID = Field(
+        foreign_key="user.id", primary_key=True, ondelete="CASCADE"
+    )
+    count: int = 0
+
+
 # Properties to return via API, id is always required
 class ItemPublic(ItemBase):
     id: uuid.UUID
@@ -89,7 +143,59 @@ class ItemPublic(ItemBase):
 
 class ItemsPublic(SQLModel):
     data: list[ItemPublic]
+    # None with ?count=none
+    count: int | None
+    # Pass as ?cursor= to get the next page, None on the last one
+    next_cursor: str | None = None
+
+
+# Outcome of one row of a bulk item creation
+class ItemBulkResult(SQLModel):
+    row: int
+    status: str
+    id: uuid.UUID | None = None
+    error: str | None = None
+
+
+class ItemsBulkPublic(SQLModel):
+    data: list[ItemBulkResult]
+    created: int
+    failed: int
+    elapsed_seconds: float
+    rows_per_second: float
+
+
+# Items of a bulk update or delete, by ids and/or title prefix. Only the items
+# of the current user are written, unless superuser
+class ItemsFilter(SQLModel):
+    ids: list[uuid.UUID] | None = None
+    title_prefix: str | None = Field(default=None, min_length=1, max_length=255)
+
+
+class ItemsBulkUpdate(ItemsFilter):
+    values: ItemUpdate
+
+
+class ItemBulkWriteResult(SQLModel):
+    id: uuid.UUID
+    status: str
+
+
+class ItemsBulkWritePublic(SQLModel):
+    data: list[ItemBulkWriteResult]
     count: int
+    # More items matched the title prefix than a request writes, send it again
+    has_more: bool = False
+
+
+# Per-user token epoch, tokens issued with an older epoch are revoked.
+# No foreign key so the epoch survives the deletion of the user
+class TokenEpoch(SQLModel, table=True):
+    user_id: uuid.UUID = Field(primary_key=True)
+    epoch: int = 0
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc), index=True
+    )
 
 
 # Generic message
@@ -100,12 +206,22 @@ class Message(SQLModel):
 # JSON payload containing access token
 class Token(SQLModel):
     access_token: str
+    refresh_token: str | None = None
     token_type: str = "bearer"
 
 
 # Contents of JWT token
 class TokenPayload(SQLModel):
     sub: str | None = None
+    exp: int | None = None
+    type: str = "access"
+    epoch: int = 0
+    act: bool = True
+    su: bool = False
+
+
+class RefreshTokenRequest(SQLModel):
+    refresh_token: str
 
 
 class NewPassword(SQLModel):
@@ -0,0 +1,49 @@
+import argparse
+import logging
+from pathlib import Path
+
+from sqlmodel import Session
+
+from app.bulk import BulkFormat, create_users_bulk
+from app.core.config import settings
+from app.core.db import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Create users from a NDJSON or CSV file of UserCreate rows"
+    )
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=["ndjson", "csv"])
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.USERS_BULK_BATCH_SIZE
+    )
+    args = parser.parse_args()
+    format: BulkFormat
+    if args.format is not None:
+        format = args.format
+    else:
+        format = "csv" if args.path.suffix.lower() == ".csv" else "ndjson"
+
+    logger.info(f"Creating users from {args.path}")
+    with Session(engine) as session:
+        result = create_users_bulk(
+            session=session,
+            content=args.path.read_text(),
+            format=format,
+            batch_size=args.batch_size,
+        )
+    for row in result.data:
+        if row.status != "created":
+            logger.warning(f"Row {row.row} ({row.email}): {row.status}, {row.error}")
+    logger.info(
+        f"Created {result.created} users, {result.failed} failed, "
+        f"in {result.elapsed_seconds}s ({result.rows_per_second} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
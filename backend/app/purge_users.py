@@ -0,0 +1,29 @@
+import logging
+
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    # Finishes the purges interrupted by a restart of the workers
+    with Session(engine) as session:
+        user_ids = crud.get_users_to_purge(session=session)
+        logger.info(f"Purging {len(user_ids)} deleted users")
+        for user_id in user_ids:
+            purged = crud.purge_user(
+                session=session,
+                user_id=user_id,
+                batch_size=settings.USERS_PURGE_BATCH_SIZE,
+                pause=settings.USERS_PURGE_PAUSE_SECONDS,
+            )
+            logger.info(f"Purged user {user_id} and {purged} items")
+
+
+if __name__ == "__main__":
+    main()
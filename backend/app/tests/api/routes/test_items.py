@@ -1,10 +1,16 @@
+import json
+import time
 import uuid
+from unittest.mock import patch
 
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, func, select
 
+from app.api.pagination import encode_cursor
 from app.core.config import settings
+from app.models import Item
 from app.tests.utils.item import create_random_item
+from app.tests.utils.utils import count_statements
 
 
 def test_create_item(
@@ -79,6 +85,116 @@ def test_read_items(
     assert len(content["data"]) >= 2
 
 
+def test_read_items_cursor_pagination(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    for n in range(5):
+        client.post(url, headers=normal_user_token_headers, json={"title": f"{n}"})
+
+    seen: list[str] = []
+    params: dict[str, str | int] = {"limit": 2}
+    while True:
+        r = client.get(url, headers=normal_user_token_headers, params=params)
+        assert r.status_code == 200
+        content = r.json()
+        assert len(content["data"]) <= 2
+        seen.extend(item["id"] for item in content["data"])
+        if content["next_cursor"] is None:
+            break
+        params = {"limit": 2, "cursor": content["next_cursor"]}
+    assert seen == sorted(seen)
+    assert len(seen) == len(set(seen)) == content["count"]
+
+
+def test_read_items_invalid_cursor(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        params={"cursor": "not-a-cursor"},
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid cursor"
+
+
+def test_read_items_count_modes(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    create_random_item(db)
+    url = f"{settings.API_V1_STR}/items/"
+    client.delete(f"{url}{item.id}", headers=superuser_token_headers)
+
+    r = client.get(url, headers=superuser_token_headers)
+    # The maintained counters agree with counting the rows
+    assert r.json()["count"] == db.exec(select(func.count()).select_from(Item)).one()
+    r = client.get(url, headers=superuser_token_headers, params={"count": "none"})
+    assert r.json()["count"] is None
+    r = client.get(url, headers=superuser_token_headers, params={"count": "estimate"})
+    assert isinstance(r.json()["count"], int)
+
+
+def test_read_items_count_of_empty_page(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    client.post(url, headers=normal_user_token_headers, json={"title": "A"})
+    count = client.get(url, headers=normal_user_token_headers).json()["count"]
+
+    last = encode_cursor(uuid.UUID(int=2**128 - 1))
+    r = client.get(url, headers=normal_user_token_headers, params={"cursor": last})
+    content = r.json()
+    assert content["data"] == []
+    assert content["count"] == count > 0
+
+
+def test_read_items_fields(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    data = {"title": "Foo", "description": "Fighters"}
+    item = client.post(url, headers=normal_user_token_headers, json=data).json()
+
+    r = client.get(url, headers=normal_user_token_headers, params={"fields": "title"})
+    assert r.status_code == 200
+    content = r.json()
+    assert content["data"]
+    assert all(set(row) == {"id", "title"} for row in content["data"])
+
+    r = client.get(
+        f"{url}{item['id']}",
+        headers=normal_user_token_headers,
+        params={"fields": "title,description"},
+    )
+    assert r.json() == {"id": item["id"], "title": "Foo", "description": "Fighters"}
+
+
+def test_read_items_with_deadline(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers={
+            **superuser_token_headers,
+            "X-Request-Deadline": str(time.time() + 10),
+        },
+    )
+    assert response.status_code == 200
+
+
+def test_read_items_deadline_exceeded(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers={**superuser_token_headers, "X-Request-Deadline": str(time.time() - 1)},
+    )
+    assert response.status_code == 504
+    assert response.json() == {"detail": "Request deadline exceeded"}
+
+
 def test_update_item(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -162,3 +278,159 @@ def test_delete_item_not_enough_permissions(
     assert response.status_code == 400
     content = response.json()
     assert content["detail"] == "Not enough permissions"
+
+
+def test_item_writes_take_one_statement(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    # Resolve the user once so that only the writes are counted below
+    client.get(f"{settings.API_V1_STR}/users/me", headers=normal_user_token_headers)
+    with patch("app.api.deps.token_epochs.is_stale", return_value=False):
+        with count_statements() as statements:
+            r = client.post(url, headers=normal_user_token_headers, json={"title": "A"})
+        assert r.status_code == 200
+        assert len(statements) == 1, statements
+        item_id = r.json()["id"]
+
+        with count_statements() as statements:
+            r = client.put(
+                f"{url}{item_id}",
+                headers=normal_user_token_headers,
+                json={"title": "B"},
+            )
+        assert r.status_code == 200
+        assert r.json()["title"] == "B"
+        assert len(statements) == 1, statements
+
+        with count_statements() as statements:
+            r = client.delete(f"{url}{item_id}", headers=normal_user_token_headers)
+        assert r.status_code == 200
+        assert len(statements) == 1, statements
+
+
+def test_create_items_bulk(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    rows = [{"title": "One", "description": "First"}, {"title": "Two"}, {"title": ""}]
+    r = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers={**normal_user_token_headers, "Content-Type": "application/x-ndjson"},
+        content="\n".join(json.dumps(row) for row in rows),
+    )
+    assert r.status_code == 200
+    result = r.json()
+    assert result["created"] == 2
+    statuses = [row["status"] for row in result["data"]]
+    assert statuses == ["created", "created", "invalid"]
+    item = db.get(Item, uuid.UUID(result["data"][0]["id"]))
+    assert item
+    assert item.title == "One"
+    assert item.description == "First"
+
+
+def test_create_items_bulk_too_many_rows(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    with patch.object(settings, "ITEMS_BULK_MAX_ROWS", 1):
+        r = client.post(
+            f"{settings.API_V1_STR}/items/bulk",
+            headers={**normal_user_token_headers, "Content-Type": "text/csv"},
+            params={"format": "csv"},
+            content="title\nOne\nTwo\n",
+        )
+    assert r.status_code == 413
+
+
+def test_update_items_bulk(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    own = client.post(url, headers=normal_user_token_headers, json={"title": "A"})
+    other = create_random_item(db)
+    ids = [own.json()["id"], str(other.id)]
+    r = client.patch(
+        f"{url}bulk",
+        headers=normal_user_token_headers,
+        json={"ids": ids, "values": {"description": "Bulk"}},
+    )
+    assert r.status_code == 200
+    assert r.json()["data"] == [
+        {"id": ids[0], "status": "updated"},
+        {"id": ids[1], "status": "not_found"},
+    ]
+    r = client.get(f"{url}{ids[0]}", headers=normal_user_token_headers)
+    assert r.json()["description"] == "Bulk"
+    db.refresh(other)
+    assert other.description != "Bulk"
+
+
+def test_delete_items_bulk_by_title_prefix(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    prefix = f"cleanup-{uuid.uuid4().hex}%"
+    for n in range(3):
+        data = {"title": f"{prefix}{n}"}
+        client.post(url, headers=normal_user_token_headers, json=data)
+    client.post(url, headers=normal_user_token_headers, json={"title": "keep"})
+    with patch.object(settings, "ITEMS_BULK_WRITE_BATCH_SIZE", 2):
+        r = client.request(
+            "DELETE",
+            f"{url}bulk",
+            headers=normal_user_token_headers,
+            json={"title_prefix": prefix},
+        )
+    assert r.status_code == 200
+    content = r.json()
+    assert content["count"] == 3
+    assert content["has_more"] is False
+    assert {row["status"] for row in content["data"]} == {"deleted"}
+
+    r = client.request(
+        "DELETE", f"{url}bulk", headers=normal_user_token_headers, json={}
+    )
+    assert r.status_code == 400
+
+
+def test_delete_items_bulk_title_prefix_is_case_sensitive(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    prefix = f"Keep-{uuid.uuid4().hex}"
+    for title in (f"{prefix} me", f"{prefix.upper()} me", f"{prefix.lower()} me"):
+        client.post(url, headers=normal_user_token_headers, json={"title": title})
+    r = client.request(
+        "DELETE",
+        f"{url}bulk",
+        headers=normal_user_token_headers,
+        json={"title_prefix": prefix},
+    )
+    assert r.status_code == 200
+    assert r.json()["count"] == 1
+
+
+def test_export_items(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    url = f"{settings.API_V1_STR}/items/"
+    item = client.post(url, headers=normal_user_token_headers, json={"title": "A"})
+    other = create_random_item(db)
+
+    r = client.get(f"{url}export", headers=normal_user_token_headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    ids = [row["id"] for row in rows]
+    assert item.json()["id"] in ids
+    assert str(other.id) not in ids
+    assert ids == sorted(ids)
+    assert set(rows[0]) == {"id", "owner_id", "title", "description"}
+
+    r = client.get(
+        f"{url}export", headers=normal_user_token_headers, params={"format": "csv"}
+    )
+    assert r.status_code == 200
+    lines = r.text.splitlines()
+    assert lines[0] == "id,owner_id,title,description"
+    assert len(lines) == len(rows) + 1
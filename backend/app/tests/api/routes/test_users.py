@@ -1,4 +1,7 @@
+import json
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from unittest.mock import patch
 
 from fastapi.testclient import TestClient
@@ -7,7 +10,9 @@ from sqlmodel import Session, select
 from app import crud
 from app.core.config import settings
 from app.core.security import verify_password
-from app.models import User, UserCreate
+from app.models import Item, ItemCreate, User, UserCreate
+from app.tests.utils.item import create_random_item
+from app.tests.utils.user import user_authentication_headers
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -75,6 +80,28 @@ def test_get_existing_user(
     assert existing_user.email == api_user["email"]
 
 
+def test_get_existing_user_fields(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user = crud.create_user(session=db, user_create=user_in)
+    r = client.get(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+        params={"fields": "email"},
+    )
+    assert r.status_code == 200
+    assert r.json() == {"id": str(user.id), "email": user.email}
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/",
+        headers=superuser_token_headers,
+        params={"fields": "hashed_password"},
+    )
+    assert r.status_code == 400
+    assert r.json() == {"detail": "Unknown fields: hashed_password"}
+
+
 def test_get_existing_user_current_user(client: TestClient, db: Session) -> None:
     username = random_email()
     password = random_lower_string()
@@ -320,6 +347,31 @@ def test_register_user_already_exists_error(client: TestClient) -> None:
     assert r.json()["detail"] == "The user with this email already exists in the system"
 
 
+def test_register_user_email_case_insensitive(client: TestClient) -> None:
+    data = {
+        "email": settings.FIRST_SUPERUSER.upper(),
+        "password": random_lower_string(),
+    }
+    r = client.post(f"{settings.API_V1_STR}/users/signup", json=data)
+    assert r.status_code == 400
+    assert r.json()["detail"] == "The user with this email already exists in the system"
+
+
+def test_register_user_concurrently(client: TestClient, db: Session) -> None:
+    email = random_email()
+    data = {"email": email, "password": random_lower_string()}
+
+    def signup(_: int) -> int:
+        r = client.post(f"{settings.API_V1_STR}/users/signup", json=data)
+        return r.status_code
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        status_codes = list(executor.map(signup, range(8)))
+    assert sorted(status_codes) == [200] + [400] * 7
+    users = db.exec(select(User).where(User.email == email)).all()
+    assert len(users) == 1
+
+
 def test_update_user(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
@@ -346,6 +398,31 @@ def test_update_user(
     assert user_db.full_name == "Updated_full_name"
 
 
+def test_update_user_deactivate_cached_user(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    username = random_email()
+    password = random_lower_string()
+    user_in = UserCreate(email=username, password=password)
+    user = crud.create_user(session=db, user_create=user_in)
+    headers = user_authentication_headers(
+        client=client, email=username, password=password
+    )
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 200
+
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/{user.id}",
+        headers=superuser_token_headers,
+        json={"is_active": False},
+    )
+    assert r.status_code == 200
+
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 403
+    assert r.json()["detail"] == "Could not validate credentials"
+
+
 def test_update_user_not_exists(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -444,6 +521,62 @@ def test_delete_user_super_user(
     assert result is None
 
 
+def test_delete_user_with_items(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    item_id = item.id
+    r = client.delete(
+        f"{settings.API_V1_STR}/users/{item.owner_id}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    assert r.json()["message"] == "User deleted successfully"
+    db.expire_all()
+    assert db.exec(select(Item).where(Item.id == item_id)).first() is None
+
+
+def test_delete_user_purged_in_background(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    user_id = item.owner_id
+    crud.create_item(session=db, item_in=ItemCreate(title="second"), owner_id=user_id)
+    with (
+        patch("app.core.config.settings.USERS_PURGE_THRESHOLD", 1),
+        patch("app.core.config.settings.USERS_PURGE_BATCH_SIZE", 1),
+        patch("app.core.config.settings.USERS_PURGE_PAUSE_SECONDS", 0),
+    ):
+        r = client.delete(
+            f"{settings.API_V1_STR}/users/{user_id}",
+            headers=superuser_token_headers,
+        )
+    assert r.status_code == 200
+    assert r.json()["message"] == "User scheduled for deletion"
+    # The TestClient runs the background tasks before returning
+    db.expire_all()
+    assert db.exec(select(Item).where(Item.owner_id == user_id)).first() is None
+    assert db.exec(select(User).where(User.id == user_id)).first() is None
+
+
+def test_user_marked_deleted_is_not_found(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user_in = UserCreate(email=random_email(), password=random_lower_string())
+    user = crud.create_user(session=db, user_create=user_in)
+    user.deleted_at = datetime.now(timezone.utc)
+    db.add(user)
+    db.commit()
+    url = f"{settings.API_V1_STR}/users/{user.id}"
+
+    r = client.get(url, headers=superuser_token_headers)
+    assert r.status_code == 404
+    r = client.patch(url, headers=superuser_token_headers, json={"full_name": "x"})
+    assert r.status_code == 404
+    r = client.delete(url, headers=superuser_token_headers)
+    assert r.status_code == 404
+
+
 def test_delete_user_not_found(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -484,3 +617,72 @@ def test_delete_user_without_privileges(
     )
     assert r.status_code == 403
     assert r.json()["detail"] == "The user doesn't have enough privileges"
+
+
+def test_create_users_bulk_ndjson(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    email_1 = random_email()
+    email_2 = random_email()
+    password = random_lower_string()
+    rows = [
+        {"email": email_1, "password": password, "full_name": "Bulk One"},
+        {"email": email_2, "password": password},
+        {"email": email_1, "password": password},
+        {"email": settings.FIRST_SUPERUSER, "password": password},
+        {"email": "not-an-email", "password": password},
+    ]
+    content = "\n".join(json.dumps(row) for row in rows) + "\n{not json"
+    r = client.post(
+        f"{settings.API_V1_STR}/users/bulk",
+        headers={**superuser_token_headers, "Content-Type": "application/x-ndjson"},
+        content=content,
+    )
+    assert r.status_code == 200
+    result = r.json()
+    assert result["created"] == 2
+    assert result["failed"] == 4
+    assert [row["status"] for row in result["data"]] == [
+        "created",
+        "created",
+        "duplicate",
+        "duplicate",
+        "invalid",
+        "invalid",
+    ]
+    user = crud.get_user_by_email(session=db, email=email_1)
+    assert user
+    assert str(user.id) == result["data"][0]["id"]
+    assert user.full_name == "Bulk One"
+    assert verify_password(password, user.hashed_password)
+
+
+def test_create_users_bulk_csv(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    email = random_email()
+    password = random_lower_string()
+    content = f"email,password,full_name,is_superuser\n{email},{password},,false\n"
+    r = client.post(
+        f"{settings.API_V1_STR}/users/bulk",
+        headers={**superuser_token_headers, "Content-Type": "text/csv"},
+        params={"format": "csv"},
+        content=content,
+    )
+    assert r.status_code == 200
+    assert r.json()["created"] == 1
+    user = crud.get_user_by_email(session=db, email=email)
+    assert user
+    assert user.full_name is None
+    assert user.is_superuser is False
+
+
+def test_create_users_bulk_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/users/bulk",
+        headers={**normal_user_token_headers, "Content-Type": "application/x-ndjson"},
+        content="{}",
+    )
+    assert r.status_code == 403
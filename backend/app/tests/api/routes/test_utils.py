@@ -0,0 +1,39 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def test_read_metrics(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/metrics/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert "pid" in content
+    assert "password_hash.latency" in content["timings"]
+
+
+def test_read_metrics_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/metrics/", headers=normal_user_token_headers
+    )
+    assert r.status_code == 403
+
+
+def test_read_db_pool(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/db-pool/", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert "pid" in content
+    sync_pool = content["pools"]["sync"]
+    assert sync_pool["size"] == settings.DB_POOL_SIZE
+    assert sync_pool["checked_out"] >= 0
+    assert sync_pool["timeouts"] == 0
@@ -0,0 +1,47 @@
+import uuid
+from datetime import timedelta
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.api.middleware import ReadYourWritesMiddleware, prefers_primary
+from app.core.security import create_access_token
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware, window=60)
+
+    @app.get("/read")
+    def read(request: Request) -> bool:
+        return prefers_primary(request)
+
+    @app.post("/write")
+    def write() -> None:
+        return None
+
+    return app
+
+
+def test_read_your_writes_is_keyed_on_the_user() -> None:
+    client = TestClient(make_app())
+    writer = {
+        "Authorization": "Bearer "
+        + create_access_token(uuid.uuid4(), timedelta(minutes=5))
+    }
+    other = {
+        "Authorization": "Bearer "
+        + create_access_token(uuid.uuid4(), timedelta(minutes=5))
+    }
+    assert client.get("/read", headers=writer).json() is False
+    client.post("/write", headers=writer)
+    assert client.get("/read", headers=writer).json() is True
+    assert client.get("/read", headers=other).json() is False
+    assert client.get("/read").json() is False
+
+
+def test_read_your_writes_ignores_invalid_tokens() -> None:
+    client = TestClient(make_app())
+    headers = {"Authorization": "Bearer invalid"}
+    client.post("/write", headers=headers)
+    assert client.get("/read", headers=headers).json() is False
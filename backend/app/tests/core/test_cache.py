@@ -0,0 +1,41 @@
+import time
+
+from app.core.cache import TTLCache
+
+
+def test_get_and_expire() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+
+def test_evicts_least_recently_used() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")
+    cache.set("c", 3, ttl=60)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_invalidate_tag() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10)
+    cache.set("token-1", 1, ttl=60, tag="user-1")
+    cache.set("token-2", 1, ttl=60, tag="user-1")
+    cache.set("token-3", 2, ttl=60, tag="user-2")
+    cache.invalidate_tag("user-1")
+    assert cache.get("token-1") is None
+    assert cache.get("token-2") is None
+    assert cache.get("token-3") == 2
+
+
+def test_disabled_cache() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=0)
+    cache.set("a", 1, ttl=60)
+    assert cache.get("a") is None
@@ -0,0 +1,32 @@
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.pool import NullPool
+
+from app.core.dialect import IS_POSTGRES
+from app.core.pool import InstrumentedQueuePool, connect_args, engine_options
+
+postgres_only = pytest.mark.skipif(not IS_POSTGRES, reason="psycopg options")
+
+
+@postgres_only
+def test_connect_args_prepare_threshold() -> None:
+    with patch("app.core.config.settings.DB_PREPARE_THRESHOLD", 0):
+        assert connect_args()["prepare_threshold"] == 0
+
+
+@postgres_only
+def test_connect_args_pgbouncer_disables_prepared_statements() -> None:
+    with (
+        patch("app.core.config.settings.DB_PREPARE_THRESHOLD", 0),
+        patch("app.core.config.settings.DB_PGBOUNCER_TRANSACTION_POOLING", True),
+    ):
+        assert connect_args() == {"prepare_threshold": None}
+
+
+def test_engine_options_pool_class() -> None:
+    assert engine_options(name="test")["poolclass"] is InstrumentedQueuePool
+    with patch("app.core.config.settings.DB_POOL_CLASS", "null"):
+        options = engine_options(name="test")
+    assert options["poolclass"] is NullPool
+    assert "pool_size" not in options
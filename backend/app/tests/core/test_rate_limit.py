@@ -0,0 +1,21 @@
+from app.core.rate_limit import MemoryRateLimitBackend
+
+
+def test_memory_backend_limits_hits() -> None:
+    backend = MemoryRateLimitBackend()
+    assert backend.hit("key", limit=2, window=60) is None
+    assert backend.hit("key", limit=2, window=60) is None
+    retry_after = backend.hit("key", limit=2, window=60)
+    assert retry_after is not None
+    assert 0 < retry_after <= 60
+
+
+def test_memory_backend_evicts_least_recently_hit_keys() -> None:
+    backend = MemoryRateLimitBackend(max_keys=2)
+    backend.hit("first", limit=1, window=60)
+    backend.hit("second", limit=1, window=60)
+    # "first" is limited, and hitting it again makes "second" the oldest key
+    assert backend.hit("first", limit=1, window=60) is not None
+    backend.hit("third", limit=1, window=60)
+    assert backend.hit("first", limit=1, window=60) is not None
+    assert backend.hit("second", limit=1, window=60) is None
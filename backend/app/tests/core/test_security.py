@@ -0,0 +1,32 @@
+import asyncio
+from unittest.mock import patch
+
+from app.core import security
+from app.core.metrics import metrics
+
+
+def test_hash_and_verify_inline() -> None:
+    hashed = security.get_password_hash("secret-password")
+    assert security.verify_password("secret-password", hashed)
+    assert not security.verify_password("wrong-password", hashed)
+
+
+def test_hash_and_verify_in_process_pool() -> None:
+    with patch("app.core.config.settings.PASSWORD_HASH_WORKERS", 1):
+        try:
+            hashed = security.get_password_hash("secret-password")
+            assert security.verify_password("secret-password", hashed)
+            assert asyncio.run(
+                security.verify_password_async("secret-password", hashed)
+            )
+            assert security.get_password_hash_pool() is not None
+        finally:
+            security.shutdown_password_hash_pool()
+    snapshot = metrics.snapshot()
+    assert snapshot["gauges"]["password_hash.queue_depth"] == 0
+    assert snapshot["timings"]["password_hash.latency"]["count"] > 0
+
+
+def test_async_wrappers_inline() -> None:
+    hashed = asyncio.run(security.get_password_hash_async("secret-password"))
+    assert asyncio.run(security.verify_password_async("secret-password", hashed))
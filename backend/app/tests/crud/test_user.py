@@ -2,7 +2,7 @@ from fastapi.encoders import jsonable_encoder
 from sqlmodel import Session
 
 from app import crud
-from app.core.security import verify_password
+from app.core.security import build_crypt_context, verify_password
 from app.models import User, UserCreate, UserUpdate
 from app.tests.utils.utils import random_email, random_lower_string
 
@@ -89,3 +89,79 @@ def test_update_user(db: Session) -> None:
     assert user_2
     assert user.email == user_2.email
     assert verify_password(new_password, user_2.hashed_password)
+
+
+def test_authenticate_rehashes_outdated_hash(db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user_in = UserCreate(email=email, password=password)
+    user = crud.create_user(session=db, user_create=user_in)
+    weak_context = build_crypt_context(
+        scheme="bcrypt",
+        bcrypt_rounds=4,
+        argon2_memory_cost=1024,
+        argon2_time_cost=1,
+        argon2_parallelism=1,
+    )
+    outdated_hash = weak_context.hash(password)
+    crud.update_password_hash(
+        session=db, user_id=user.id, hashed_password=outdated_hash
+    )
+
+    rehashed: list[str] = []
+    authenticated_user = crud.authenticate(
+        session=db,
+        email=email,
+        password=password,
+        on_rehash=lambda _, new_hash: rehashed.append(new_hash),
+    )
+    assert authenticated_user
+    assert len(rehashed) == 1
+    assert rehashed[0] != outdated_hash
+    assert verify_password(password, rehashed[0])
+
+    crud.authenticate(session=db, email=email, password=password)
+    db.refresh(user)
+    assert user.hashed_password != outdated_hash
+    assert verify_password(password, user.hashed_password)
+
+
+def test_authenticate_argon2_hash_after_switching_to_bcrypt(db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user = crud.create_user(
+        session=db, user_create=UserCreate(email=email, password=password)
+    )
+    argon2_context = build_crypt_context(
+        scheme="argon2",
+        bcrypt_rounds=4,
+        argon2_memory_cost=1024,
+        argon2_time_cost=1,
+        argon2_parallelism=1,
+    )
+    crud.update_password_hash(
+        session=db, user_id=user.id, hashed_password=argon2_context.hash(password)
+    )
+
+    rehashed: list[str] = []
+    authenticated_user = crud.authenticate(
+        session=db,
+        email=email,
+        password=password,
+        on_rehash=lambda _, new_hash: rehashed.append(new_hash),
+    )
+    assert authenticated_user
+    assert len(rehashed) == 1
+    assert rehashed[0].startswith("$2b$")
+
+
+def test_not_authenticate_unknown_hash(db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user = crud.create_user(
+        session=db, user_create=UserCreate(email=email, password=password)
+    )
+    crud.update_password_hash(
+        session=db, user_id=user.id, hashed_password="not-a-known-hash"
+    )
+    assert crud.authenticate(session=db, email=email, password=password) is None
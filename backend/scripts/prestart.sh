@@ -11,3 +11,6 @@ alembic upgrade head
 
 # Create initial data in DB
 python app/initial_data.py
+
+# Finish purging the users deleted before a restart
+python app/purge_users.py
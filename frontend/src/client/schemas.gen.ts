@@ -212,12 +212,35 @@ export const NewPasswordSchema = {
   title: "NewPassword",
 } as const
 
+export const RefreshTokenRequestSchema = {
+  properties: {
+    refresh_token: {
+      type: "string",
+      title: "Refresh Token",
+    },
+  },
+  type: "object",
+  required: ["refresh_token"],
+  title: "RefreshTokenRequest",
+} as const
+
 export const TokenSchema = {
   properties: {
     access_token: {
       type: "string",
       title: "Access Token",
     },
+    refresh_token: {
+      anyOf: [
+        {
+          type: "string",
+        },
+        {
+          type: "null",
+        },
+      ],
+      title: "Refresh Token",
+    },
     token_type: {
       type: "string",
       title: "Token Type",
@@ -16,6 +16,9 @@ import type {
   ItemsDeleteItemResponse,
   LoginLoginAccessTokenData,
   LoginLoginAccessTokenResponse,
+  LoginRefreshAccessTokenData,
+  LoginRefreshAccessTokenResponse,
+  LoginLogoutResponse,
   LoginTestTokenResponse,
   LoginRecoverPasswordData,
   LoginRecoverPasswordResponse,
@@ -192,6 +195,41 @@ export class LoginService {
     })
   }
 
+  /**
+   * Refresh Access Token
+   * Get a new access token (and refresh token) using a refresh token
+   * @param data The data for the request.
+   * @param data.requestBody
+   * @returns Token Successful Response
+   * @throws ApiError
+   */
+  public static refreshAccessToken(
+    data: LoginRefreshAccessTokenData,
+  ): CancelablePromise<LoginRefreshAccessTokenResponse> {
+    return __request(OpenAPI, {
+      method: "POST",
+      url: "/api/v1/login/refresh-token",
+      body: data.requestBody,
+      mediaType: "application/json",
+      errors: {
+        422: "Validation Error",
+      },
+    })
+  }
+
+  /**
+   * Logout
+   * Revoke all the access and refresh tokens of the current user
+   * @returns Message Successful Response
+   * @throws ApiError
+   */
+  public static logout(): CancelablePromise<LoginLogoutResponse> {
+    return __request(OpenAPI, {
+      method: "POST",
+      url: "/api/v1/logout",
+    })
+  }
+
   /**
    * Test Token
    * Test access token
@@ -51,8 +51,13 @@ export type PrivateUserCreate = {
   is_verified?: boolean
 }
 
+export type RefreshTokenRequest = {
+  refresh_token: string
+}
+
 export type Token = {
   access_token: string
+  refresh_token?: string | null
   token_type?: string
 }
 
@@ -145,6 +150,14 @@ export type LoginLoginAccessTokenData = {
 
 export type LoginLoginAccessTokenResponse = Token
 
+export type LoginRefreshAccessTokenData = {
+  requestBody: RefreshTokenRequest
+}
+
+export type LoginRefreshAccessTokenResponse = Token
+
+export type LoginLogoutResponse = Message
+
 export type LoginTestTokenResponse = UserPublic
 
 export type LoginRecoverPasswordData = {
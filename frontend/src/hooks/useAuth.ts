@@ -6,16 +6,79 @@ import {
   type Body_login_login_access_token as AccessToken,
   type ApiError,
   LoginService,
+  type Token,
   type UserPublic,
   type UserRegister,
   UsersService,
 } from "@/client"
+import type { ApiRequestOptions } from "@/client/core/ApiRequestOptions"
 import { handleError } from "@/utils"
 
+// Access tokens are refreshed when they expire within this many milliseconds
+const REFRESH_MARGIN = 30_000
+
+let refreshing: Promise<string> | null = null
+
 const isLoggedIn = () => {
   return localStorage.getItem("access_token") !== null
 }
 
+const storeTokens = (token: Token) => {
+  localStorage.setItem("access_token", token.access_token)
+  if (token.refresh_token) {
+    localStorage.setItem("refresh_token", token.refresh_token)
+  }
+}
+
+const clearTokens = () => {
+  localStorage.removeItem("access_token")
+  localStorage.removeItem("refresh_token")
+}
+
+const expiresSoon = (token: string) => {
+  try {
+    const payload = token.split(".")[1].replace(/-/g, "+").replace(/_/g, "/")
+    const { exp } = JSON.parse(atob(payload))
+    return exp * 1000 - Date.now() < REFRESH_MARGIN
+  } catch {
+    return false
+  }
+}
+
+const refreshAccessToken = async (refreshToken: string) => {
+  try {
+    const response = await LoginService.refreshAccessToken({
+      requestBody: { refresh_token: refreshToken },
+    })
+    storeTokens(response)
+    return response.access_token
+  } catch {
+    // The request is then sent without a token and the 401 logs the user out
+    clearTokens()
+    return ""
+  }
+}
+
+// Token resolver of the API client, gets a new access token with the refresh
+// token before the current one expires
+const getAccessToken = async (options: ApiRequestOptions<string>) => {
+  const token = localStorage.getItem("access_token") || ""
+  const refreshToken = localStorage.getItem("refresh_token")
+  if (
+    !refreshToken ||
+    options.url === "/api/v1/login/refresh-token" ||
+    !expiresSoon(token)
+  ) {
+    return token
+  }
+  if (!refreshing) {
+    refreshing = refreshAccessToken(refreshToken).finally(() => {
+      refreshing = null
+    })
+  }
+  return refreshing
+}
+
 const useAuth = () => {
   const [error, setError] = useState<string | null>(null)
   const navigate = useNavigate()
@@ -45,7 +108,7 @@ const useAuth = () => {
     const response = await LoginService.loginAccessToken({
       formData: data,
     })
-    localStorage.setItem("access_token", response.access_token)
+    storeTokens(response)
   }
 
   const loginMutation = useMutation({
@@ -59,7 +122,7 @@ const useAuth = () => {
   })
 
   const logout = () => {
-    localStorage.removeItem("access_token")
+    clearTokens()
     navigate({ to: "/login" })
   }
 
@@ -73,5 +136,5 @@ const useAuth = () => {
   }
 }
 
-export { isLoggedIn }
+export { clearTokens, getAccessToken, isLoggedIn }
 export default useAuth